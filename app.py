@@ -21,13 +21,6 @@ if not st.session_state.authenticated:
 
 from modules.database import DatabaseManager
 from interfaces.sidebar import SidebarManager
-from modules.logic.ventas import VentasLogic
-from modules.logic.compras_gastos import ComprasGastosLogic
-from modules.logic.consultas import ConsultasLogic
-from interfaces.registro.registro_ui import RegistroUI
-from interfaces.registro.ventas_ui import VentasUI
-from interfaces.registro.compras_gastos_ui import ComprasGastosUI
-from interfaces.consultas.gastos_ui import ConsultasUI
 
 # Inicializar componentes principales
 @st.cache_resource
@@ -35,20 +28,28 @@ def inicializar_db():
     return DatabaseManager()
 
 db = inicializar_db()
-sidebar = SidebarManager()
+sidebar = SidebarManager(cola=db.cola)
 
-# Inicializar lógicas de negocio
-ventas_logic = VentasLogic(db)
-compras_gastos_logic = ComprasGastosLogic(db)
-consultas_logic = ConsultasLogic(db)
-
-# Routing de vistas
+# Routing de vistas: cada ruta importa solo sus módulos (plotly solo en Consulta y Análisis)
 if sidebar.menu_option == "Registro":
-    registro_ui = RegistroUI(ventas_logic, compras_gastos_logic)
+    from modules.logic.ventas import VentasLogic
+    from modules.logic.compras_gastos import ComprasGastosLogic
+    from interfaces.registro.registro_ui import RegistroUI
+    
+    registro_ui = RegistroUI(VentasLogic(db), ComprasGastosLogic(db))
     registro_ui.mostrar_interfaz()
 
 elif sidebar.menu_option == "Consulta":
-    ConsultasUI(consultas_logic).mostrar_consulta_completa()
+    from modules.logic.consultas import ConsultasLogic
+    from interfaces.consultas.gastos_ui import ConsultasUI
+    
+    ConsultasUI(ConsultasLogic(db)).mostrar_consulta_completa()
+
+elif sidebar.menu_option == "Análisis":
+    from modules.logic.analisis import AnalisisLogic
+    from interfaces.analisis.analisis_ui import AnalisisUI
+    
+    AnalisisUI(AnalisisLogic(db)).mostrar_analisis_completo()
 
 # Footer con información de sesión
 st.sidebar.markdown("---")
@@ -57,11 +58,16 @@ st.sidebar.markdown(f"""
 **Última actualización:** {datetime.now().strftime("%d/%m/%Y %H:%M")}
 """)
 
-# Codigo de prueba
-try:
-    test_data = db.client.table("compras").select("*").limit(1).execute()
-    st.sidebar.success(f"✅ Conexión exitosa a Supabase. Proyecto: {db.client.supabase_url}")
-    st.sidebar.write("Datos de prueba:", test_data.data)
-except Exception as e:
-    st.sidebar.error(f"❌ Error de conexión: {str(e)}")
-    st.stop()
+# Estado de la conexión: lo calcula el monitor en segundo plano, el rerun no espera a la red
+salud = db.salud.estado()
+if salud["ok"] is None:
+    st.sidebar.info("⏳ Comprobando conexión con Supabase...")
+elif salud["ok"]:
+    st.sidebar.success(
+        f"✅ Conexión a Supabase · {salud['latencia'] * 1000:,.0f} ms "
+        f"(p50 {salud['p50'] * 1000:,.0f} · p95 {salud['p95'] * 1000:,.0f} ms)"
+    )
+else:
+    st.sidebar.error(f"❌ Error de conexión: {salud['ultimo_error']}")
+if salud["muestras"]:
+    st.sidebar.caption(f"Errores: {salud['tasa_error']:.0%} de las últimas {salud['muestras']} comprobaciones")
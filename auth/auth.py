@@ -2,15 +2,12 @@
 import streamlit as st
 import hashlib
 import yaml
-from supabase import create_client
+from modules.conexion import obtener_cliente
 
 # Configuración inicial
 def init_auth():
-    """Inicializa la conexión a Supabase para autenticación"""
-    return create_client(
-        st.secrets["SUPABASE_URL"],
-        st.secrets["SUPABASE_KEY"]
-    )
+    """Cliente Supabase para autenticación (compartido con el resto de la app)"""
+    return obtener_cliente()
 
 # Función para verificar credenciales
 def check_credentials(username: str, password: str) -> bool:
@@ -0,0 +1,110 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+from datetime import datetime, timedelta
+from modules.logic.series import preparar_serie
+
+class AnalisisUI:
+    def __init__(self, logic):
+        self.logic = logic
+
+    def mostrar_filtros(self):
+        """Rango de fechas del análisis"""
+        col1, col2 = st.columns(2)
+        fecha_inicio = col1.date_input("Desde", value=datetime.today() - timedelta(days=90), key="analisis_inicio")
+        fecha_fin = col2.date_input("Hasta", value=datetime.today(), key="analisis_fin")
+        return fecha_inicio, fecha_fin
+
+    @staticmethod
+    def _porcentaje(valor):
+        return None if pd.isna(valor) else f"{valor:.1%}"
+
+    def mostrar_kpis(self, kpis):
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric(
+            "Ingresos",
+            f"${kpis['ingresos']:,.2f}",
+            delta=self._porcentaje(kpis['tendencia_7_28']),
+            help="Variación: media diaria de los últimos 7 días frente a los últimos 28"
+        )
+        col2.metric("Food cost", self._porcentaje(kpis['food_cost_pct']) or "N/A", help="Compras de mercancía / ingresos")
+        col3.metric(
+            "Margen operativo",
+            f"${kpis['margen_operativo']:,.2f}",
+            delta=self._porcentaje(kpis['margen_pct']),
+            delta_color="off"
+        )
+        col4.metric(
+            "Cuenta casa",
+            self._porcentaje(kpis['participacion_cuenta_casa']) or "N/A",
+            help="Parte de las ventas registradas como cuenta casa"
+        )
+
+    def mostrar_graficos(self, resultado):
+        # Serie diaria (las medias ya suavizan) reducida con LTTB si supera el presupuesto de puntos
+        porcentajes = ['food_cost_pct_7d', 'food_cost_pct_28d', 'margen_pct_28d']
+        diario, _ = preparar_serie(
+            resultado['diario'].reset_index(), 'fecha',
+            ['ingresos', 'ingresos_media_7d', 'ingresos_media_28d', *porcentajes],
+            frecuencia='D',
+            sin_agregar=porcentajes
+        )
+
+        fig = px.line(
+            diario, x='fecha', y=['ingresos', 'ingresos_media_7d', 'ingresos_media_28d'],
+            title="Ingresos diarios y medias móviles",
+            labels={'value': 'Monto ($)', 'fecha': 'Fecha', 'variable': ''}
+        )
+        fig.update_layout(hovermode="x unified")
+        st.plotly_chart(fig, use_container_width=True)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            fig = px.line(
+                diario, x='fecha', y=porcentajes,
+                title="Food cost y margen (móviles)",
+                labels={'value': '%', 'fecha': 'Fecha', 'variable': ''}
+            )
+            fig.update_layout(hovermode="x unified", yaxis_tickformat=".0%")
+            st.plotly_chart(fig, use_container_width=True)
+        with col2:
+            entidades = list(resultado['por_entidad'].columns)
+            por_entidad, periodo = preparar_serie(resultado['por_entidad'].reset_index(), 'fecha', entidades)
+            fig = px.area(
+                por_entidad, x='fecha', y=entidades,
+                title=f"Ingresos por entidad (por {periodo})",
+                labels={'value': 'Monto ($)', 'fecha': 'Fecha', 'variable': 'Entidad'}
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+        por_grupo = resultado['por_grupo'].head(15)
+        if not por_grupo.empty:
+            fig = px.bar(
+                por_grupo, x='venta', y='grupo', orientation='h',
+                title="Grupos con más ingresos",
+                labels={'venta': 'Monto ($)', 'grupo': 'Grupo'}
+            )
+            fig.update_layout(yaxis={'categoryorder': 'total ascending'})
+            st.plotly_chart(fig, use_container_width=True)
+
+    def mostrar_analisis_completo(self):
+        """Interfaz completa de análisis"""
+        st.header("📈 Módulo de Análisis")
+        fecha_inicio, fecha_fin = self.mostrar_filtros()
+        if fecha_inicio > fecha_fin:
+            st.warning("La fecha inicial debe ser anterior a la final")
+            return
+
+        try:
+            with st.spinner("Calculando indicadores..."):
+                resultado = self.logic.calcular(fecha_inicio, fecha_fin)
+        except Exception as e:
+            st.error(f"Error en el análisis: {str(e)}")
+            return
+
+        if not resultado['kpis']['ingresos'] and not resultado['kpis']['compras'] and not resultado['kpis']['gastos']:
+            st.warning("No hay movimientos en el periodo seleccionado")
+            return
+
+        self.mostrar_kpis(resultado['kpis'])
+        self.mostrar_graficos(resultado)
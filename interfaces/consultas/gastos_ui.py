@@ -1,7 +1,8 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime, timedelta
 import plotly.express as px
+from modules.logic.series import preparar_serie
+from interfaces.consultas.tabla_paginada import mostrar_tabla_paginada
 
 class ConsultasUI:
     def __init__(self, logic):  # <- ¡Este método faltaba!
@@ -15,7 +16,7 @@ class ConsultasUI:
             with col1:
                 categoria = st.selectbox(
                     "Categoría*",
-                    options=["Mercancía", "Servicios", "Equipos", "Nómina", "Otros"],
+                    options=self.logic.categorias(),
                     index=0
                 )
                 
@@ -32,45 +33,39 @@ class ConsultasUI:
             'busqueda': busqueda.strip()
         }
 
-    def _mostrar_graficos(self, df, tipo):
-        """Muestra gráfico de evolución temporal"""
-        df_fecha = df.groupby('fecha')['monto'].sum().reset_index()
+    def _mostrar_graficos(self, agregado, tipo):
+        """Muestra gráfico de evolución temporal a partir del agregado diario"""
+        # Granularidad según el rango y como mucho PUNTOS_MAXIMOS puntos enviados al navegador
+        df_fecha, periodo = preparar_serie(agregado, 'fecha', ['monto'])
         fig = px.line(df_fecha, x='fecha', y='monto', 
-                     title=f"Evolución de {'Compras' if tipo == 'compras' else 'Gastos'}",
+                     title=f"Evolución de {'Compras' if tipo == 'compras' else 'Gastos'} (por {periodo})",
                      labels={'monto': 'Monto Total ($)', 'fecha': 'Fecha'},
-                     markers=True)
+                     markers=len(df_fecha) <= 100)
         fig.update_layout(hovermode="x unified")
         st.plotly_chart(fig, use_container_width=True)
 
-    def mostrar_resultados(self, df, tipo):
+    def mostrar_resultados(self, tipo, filtros, agregado):
         """Muestra los resultados de la consulta"""
         st.subheader("📊 Resultados")
         
-        if df.empty:
+        if agregado.empty:
             st.warning("No se encontraron registros con los filtros seleccionados")
             return
-        # Convertir fecha a datetime
-        df['fecha'] = pd.to_datetime(df['fecha']).dt.date
-
-        # Mostrar métricas rápidas
-        total = df['monto'].sum()
-        max_dia = df.groupby('fecha')['monto'].sum().idxmax()
+        # `fecha` ya llega como datetime64 desde el decodificador tipado
+        # Métricas rápidas sobre el agregado (calculado en el servidor)
+        metricas = self.logic.generar_metricas(agregado)
         
         col1, col2 = st.columns(2)
-        col1.metric("Total general", f"${total:,.2f}")
-        col2.metric("Día de mayor movimiento", max_dia.strftime("%d/%m/%Y"))
+        col1.metric("Total general", f"${metricas['total']:,.2f}")
+        col2.metric("Día de mayor movimiento", metricas['dia_mayor_movimiento'].strftime("%d/%m/%Y"))
         
-        # Mostrar tabla con formato
-        columnas = ['fecha', 'producto', 'monto', 'categoria']
-        if tipo == "compras":
-            columnas.extend(['cantidad', 'unidad_medida'])
-        else:
-            columnas.append('descripcion')
-            
-        st.dataframe(
-            df[columnas],
-            height=400,
-            use_container_width=True,
+        # Tabla paginada: solo la página visible se pide a Supabase y se envía al navegador
+        mostrar_tabla_paginada(
+            lambda pagina, tamano, orden, descendente: self.logic.obtener_pagina(
+                tipo, filtros, pagina, tamano, orden, descendente
+            ),
+            self.logic.COLUMNAS[tipo],
+            clave="consulta",
             column_config={
                 'monto': st.column_config.NumberColumn(format="$%.2f"),
                 'fecha': st.column_config.DateColumn(format="DD/MM/YYYY")
@@ -78,27 +73,48 @@ class ConsultasUI:
         )
         
         # Mostrar gráficos
-        self._mostrar_graficos(df, tipo)
+        self._mostrar_graficos(agregado, tipo)
+
+    @st.fragment
+    def _mostrar_panel_resultados(self):
+        """Resultados de los filtros aplicados.
+
+        Es un fragmento: paginar u ordenar solo vuelve a ejecutar este panel.
+        Los filtros llegan por session_state (`consulta_filtros`).
+        """
+        filtros = st.session_state.get("consulta_filtros")
+        if not filtros:
+            return
+        
+        with st.spinner("Buscando registros..."):
+            try:
+                # Determinar tabla automáticamente por categoría
+                tabla = "compras" if filtros['categoria'] == "Mercancía" else "gastos"
+                
+                agregado = self.logic.obtener_agregado(
+                    tabla=tabla,
+                    filtros=filtros,
+                    agrupar=('fecha', 'categoria')
+                )
+                
+                # Mostrar resultados
+                self.mostrar_resultados(tabla, filtros, agregado)
+                
+            except Exception as e:
+                st.error(f"Error en la consulta: {str(e)}")
 
     def mostrar_consulta_completa(self):
         """Interfaz completa de consultas"""
         st.header("🔍 Módulo de Consultas")
-        filtros = self.mostrar_filtros()
         
-        if st.button("🔍 Ejecutar Consulta", type="primary"):
-            with st.spinner("Buscando registros..."):
-                try:
-                    # Determinar tabla automáticamente por categoría
-                    tabla = "compras" if filtros['categoria'] == "Mercancía" else "gastos"
-                    
-                    # Obtener datos
-                    df = self.logic.obtener_datos_consulta(
-                        tabla=tabla,
-                        filtros=filtros
-                    )
-                    
-                    # Mostrar resultados
-                    self.mostrar_resultados(df, tabla)
-                    
-                except Exception as e:
-                    st.error(f"Error en la consulta: {str(e)}")
\ No newline at end of file
+        # En un formulario: escribir en los filtros no provoca reruns hasta ejecutar
+        with st.form("form_consulta"):
+            filtros = self.mostrar_filtros()
+            ejecutar = st.form_submit_button("🔍 Ejecutar Consulta", type="primary")
+        
+        # Los filtros aplicados se conservan para que la paginación sobreviva a los reruns
+        if ejecutar:
+            st.session_state.consulta_filtros = filtros
+            st.session_state.consulta_pagina = 1
+        
+        self._mostrar_panel_resultados()
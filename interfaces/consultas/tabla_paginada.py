@@ -0,0 +1,47 @@
+import math
+import streamlit as st
+
+TAMANOS_PAGINA = [25, 50, 100, 250]
+
+def mostrar_tabla_paginada(obtener_pagina, columnas, clave, column_config=None):
+    """Tabla que pide y envía al navegador una sola página de resultados.
+
+    `obtener_pagina(pagina, tamano, orden, descendente)` devuelve
+    (DataFrame, total). El estado (página, orden, tamaño) vive en
+    `st.session_state` bajo el prefijo `clave`.
+    """
+    clave_pagina = f"{clave}_pagina"
+    if clave_pagina not in st.session_state:
+        st.session_state[clave_pagina] = 1
+
+    def reiniciar_pagina():
+        st.session_state[clave_pagina] = 1
+
+    col1, col2, col3 = st.columns([2, 1, 1])
+    orden = col1.selectbox("Ordenar por", columnas, key=f"{clave}_orden", on_change=reiniciar_pagina)
+    descendente = col2.toggle("Descendente", value=True, key=f"{clave}_desc", on_change=reiniciar_pagina)
+    tamano = col3.selectbox(
+        "Filas por página", TAMANOS_PAGINA, index=1, key=f"{clave}_tamano", on_change=reiniciar_pagina
+    )
+
+    pagina = st.session_state[clave_pagina]
+    df, total = obtener_pagina(pagina, tamano, orden, descendente)
+    paginas = max(1, math.ceil(total / tamano))
+    if pagina > paginas:
+        # Los datos cambiaron y la página ya no existe: se muestra la última
+        pagina = paginas
+        st.session_state[clave_pagina] = pagina
+        df, total = obtener_pagina(pagina, tamano, orden, descendente)
+
+    st.dataframe(
+        df[columnas],
+        height=min(400, 35 * (len(df) + 1) + 3),
+        use_container_width=True,
+        hide_index=True,
+        column_config=column_config
+    )
+
+    col1, col2 = st.columns([1, 3])
+    col1.number_input("Página", min_value=1, max_value=paginas, step=1, key=clave_pagina)
+    inicio = (pagina - 1) * tamano
+    col2.caption(f"Mostrando {inicio + 1 if total else 0}–{inicio + len(df)} de {total:,} registros")
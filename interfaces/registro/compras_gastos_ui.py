@@ -1,15 +1,34 @@
 import streamlit as st
 from datetime import datetime
+from modules.catalogo import CATEGORIAS_BASE, UNIDADES_BASE
 
 class ComprasGastosUI:
     def __init__(self, logic):
         self.logic = logic
+    
+    def _campo_catalogo(self, etiqueta, tipo, placeholder):
+        """Desplegable con los valores conocidos más un campo para escribir uno nuevo"""
+        conocido = st.selectbox(
+            etiqueta,
+            options=self.logic.opciones(tipo),
+            index=None,
+            placeholder="Elegir de los registrados..."
+        )
+        nuevo = st.text_input(
+            f"{etiqueta} (nuevo)",
+            placeholder=placeholder,
+            label_visibility="collapsed"
+        )
+        return nuevo.strip() or conocido or ""
         
+    @st.fragment
     def show_form(self):
-        with st.form("form_compras_gastos"):
+        """Formulario de compras y gastos (fragmento: se guarda sin recargar la app)"""
+        # clear_on_submit: tras guardar el formulario queda vacío y un segundo clic no duplica
+        with st.form("form_compras_gastos", clear_on_submit=True):
             categoria = st.selectbox(
                 "Categoría*",
-                options=["Mercancía", "Servicios", "Equipos", "Nómina", "Otros"],
+                options=self.logic.opciones("categoria", CATEGORIAS_BASE),
                 index=0
             )
             
@@ -17,9 +36,9 @@ class ComprasGastosUI:
             
             with col1:
                 fecha = st.date_input("Fecha*", value=datetime.today())
-                producto = st.text_input("Producto*", placeholder="Ej: Suministros varios")
+                producto = self._campo_catalogo("Producto*", "producto", "O escriba uno nuevo. Ej: Suministros varios")
                 monto = st.number_input("Monto Total*", min_value=0.0, format="%.2f") 
-                proveedor = st.text_input("Proveedor", placeholder="Opcional")
+                proveedor = self._campo_catalogo("Proveedor", "proveedor", "O escriba uno nuevo (opcional)")
                 
             with col2:
                 cantidad = st.number_input("Cantidad", 
@@ -28,9 +47,10 @@ class ComprasGastosUI:
                     format="%.3f",
                     help="Requerido solo para Mercancía"
                 )
+                unidades = [*self.logic.opciones("unidad", UNIDADES_BASE), "N/A"]
                 unidad = st.selectbox("Unidad Medida", 
-                    options=["kg", "litro", "unidad", "paquete", "N/A"],
-                    index=4 if categoria != "Mercancía" else 2,
+                    options=unidades,
+                    index=unidades.index("N/A") if categoria != "Mercancía" else unidades.index("unidad"),
                     help="Seleccione 'N/A' si no aplica"
                 )
                 
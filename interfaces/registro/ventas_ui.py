@@ -1,6 +1,6 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 
 class VentasUI:
     def __init__(self, logic):
@@ -23,8 +23,13 @@ class VentasUI:
             key="fecha_comun"
         )
     
+    @st.fragment
     def _mostrar_formulario_entidad(self, entidad):
-        """Componente reusable para cada entidad"""
+        """Componente reusable para cada entidad.
+
+        Es un fragmento: subir o cambiar el archivo solo vuelve a ejecutar esta
+        entidad. Lo compartido (fecha común, estado por entidad) está en session_state.
+        """
         label = "🍽️ Restaurante" if entidad == "restaurante" else "🚚 Domicilio"
         estado = st.session_state[entidad]
         
@@ -42,9 +47,9 @@ class VentasUI:
             # Vista previa
             if nuevo_archivo:
                 try:
-                    df = pd.read_excel(nuevo_archivo, engine='openpyxl')
+                    df = self.logic.vista_previa(nuevo_archivo)
                     st.dataframe(
-                        df.head(3),
+                        df,
                         use_container_width=True,
                         hide_index=True,
                         column_config={"$ Venta": st.column_config.NumberColumn(format="$%.2f")}
@@ -85,31 +90,131 @@ class VentasUI:
             
             estado['registrado'] = True
             estado['archivo'] = None
-            st.toast(f"✅ {len(resultado)} registros para {entidad}", icon="✅")
+            st.toast(
+                f"✅ {resultado.filas_totales} registros para {entidad} "
+                f"({resultado.filas_por_segundo:,.0f} filas/s)",
+                icon="✅"
+            )
+            if resultado.filas_en_cola:
+                st.toast(
+                    f"⏳ {resultado.filas_en_cola} registros de {entidad} en cola: "
+                    "se enviarán al recuperar la conexión",
+                    icon="⏳"
+                )
             st.rerun()
             
         except Exception as e:
             st.error(f"🚨 Error en {entidad}: {str(e)}")
             estado['registrado'] = False
 
-    def mostrar_interfaz_completa(self):     
-        # Fecha común
-        fecha = self._mostrar_selector_fecha()
+    @st.fragment
+    def _mostrar_importacion_lote(self):
+        """Importación de varios archivos (varios días y entidades) de una vez.
+
+        Es un fragmento: editar las asignaciones no vuelve a ejecutar la página.
+        """
+        archivos = st.file_uploader(
+            "Subir archivos Excel",
+            type=["xlsx"],
+            key="uploader_lote",
+            accept_multiple_files=True,
+            help="La fecha y la entidad se deducen del nombre (ej: domicilio_2024-05-01.xlsx)"
+        )
+        if not archivos:
+            return
         
-        # Dos columnas para cada entidad
-        col1, col2 = st.columns(2)
+        # Destino deducido del nombre, editable antes de importar
+        asignaciones = pd.DataFrame([
+            dict(zip(("fecha", "entidad"), self.logic.inferir_destino(archivo.name)), archivo=archivo.name)
+            for archivo in archivos
+        ])
+        asignaciones['fecha'] = pd.to_datetime(asignaciones['fecha']).dt.date
+        asignaciones = st.data_editor(
+            asignaciones[['archivo', 'fecha', 'entidad']],
+            key="asignaciones_lote",
+            hide_index=True,
+            use_container_width=True,
+            disabled=['archivo'],
+            column_config={
+                'fecha': st.column_config.DateColumn("Fecha", format="DD/MM/YYYY"),
+                'entidad': st.column_config.SelectboxColumn("Entidad", options=["restaurante", "domicilio"])
+            }
+        )
         
-        with col1:
-            self._mostrar_formulario_entidad("restaurante")
+        if st.button("📦 Importar lote", type="primary", key="btn_lote"):
+            with st.spinner("Procesando archivos..."):
+                try:
+                    resumen, resultado = self.logic.registrar_lote([
+                        (
+                            archivo,
+                            fila.fecha.isoformat() if pd.notna(fila.fecha) else None,
+                            fila.entidad if pd.notna(fila.entidad) else None
+                        )
+                        for archivo, fila in zip(archivos, asignaciones.itertuples())
+                    ])
+                except Exception as e:
+                    st.error(f"🚨 Error en la importación: {str(e)}")
+                    return
+            
+            if resultado:
+                st.success(
+                    f"✅ {resultado.filas_totales} registros importados "
+                    f"({resultado.filas_por_segundo:,.0f} filas/s)"
+                )
+                if resultado.filas_en_cola:
+                    st.info(
+                        f"⏳ {resultado.filas_en_cola} registros en cola: "
+                        "se enviarán al recuperar la conexión"
+                    )
+            st.dataframe(resumen, hide_index=True, use_container_width=True)
+
+    def _mostrar_dias_faltantes(self):
+        """Calendario de los últimos 30 días sin ventas registradas"""
+        with st.expander("📆 Días sin registrar (últimos 30 días)"):
+            hoy = datetime.today().date()
+            try:
+                faltantes = self.logic.dias_faltantes(hoy - timedelta(days=29), hoy)
+            except Exception as e:
+                # Sin conexión los formularios siguen disponibles (registran en la cola local)
+                st.warning(f"⚠️ No se pudo consultar el calendario: {str(e)}")
+                return
+            if not faltantes:
+                st.success("✅ Todos los días están registrados")
+                return
             
-        with col2:
-            self._mostrar_formulario_entidad("domicilio")
+            calendario = pd.DataFrame(faltantes, columns=['fecha', 'entidad'])
+            calendario['pendiente'] = "❌"
+            st.dataframe(
+                calendario.pivot(index='fecha', columns='entidad', values='pendiente').fillna("✅"),
+                use_container_width=True
+            )
+
+    def mostrar_interfaz_completa(self):     
+        tab_diario, tab_lote = st.tabs(["📅 Registro diario", "📦 Importación por lotes"])
+        
+        with tab_lote:
+            self._mostrar_importacion_lote()
         
-        # Mensaje de ayuda
-        st.markdown("""
-        **Instrucciones:**
-        1. Seleccione fecha común para ambos registros
-        2. Suba archivos separados para cada entidad
-        3. Registre cada entidad independientemente
-        4. ¡Cada entidad solo puede registrarse una vez por fecha!
-        """)
\ No newline at end of file
+        with tab_diario:
+            # Fecha común
+            fecha = self._mostrar_selector_fecha()
+            
+            # Dos columnas para cada entidad
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                self._mostrar_formulario_entidad("restaurante")
+                
+            with col2:
+                self._mostrar_formulario_entidad("domicilio")
+            
+            self._mostrar_dias_faltantes()
+            
+            # Mensaje de ayuda
+            st.markdown("""
+            **Instrucciones:**
+            1. Seleccione fecha común para ambos registros
+            2. Suba archivos separados para cada entidad
+            3. Registre cada entidad independientemente
+            4. ¡Cada entidad solo puede registrarse una vez por fecha!
+            """)
@@ -2,8 +2,9 @@ import streamlit as st
 from streamlit_option_menu import option_menu
 
 class SidebarManager:
-    def __init__(self):
+    def __init__(self, cola=None):
         self.menu_option = None
+        self.cola = cola
         if st.session_state.authenticated:
             self._setup_sidebar()
     
@@ -26,10 +27,22 @@ class SidebarManager:
             )
             
             st.write(f"Usuario: {st.session_state.user}")
+            if self.cola is not None:
+                self._mostrar_cola()
             if st.button(
                 "🚪 Cerrar Sesión",
                 key="logout_btn", 
                 help="Cierra la sesión actual"
             ):
                 from auth.auth import logout
-                logout()
\ No newline at end of file
+                logout()
+    
+    def _mostrar_cola(self):
+        """Estado de la cola local de registros"""
+        contadores = self.cola.contadores()
+        st.caption(
+            f"🔄 Pendientes: {contadores['pendiente']} · "
+            f"Sincronizados: {contadores['enviado']}"
+        )
+        if contadores['error']:
+            st.caption(f"⚠️ {contadores['error']} registros rechazados por Supabase")
@@ -0,0 +1,95 @@
+"""Medición del tiempo de importación de la app.
+
+Cada grupo de módulos se importa en un intérprete nuevo con
+`python -X importtime`, así se mide un arranque en frío real. Sirve para
+el informe de `python -m modules.mantenimiento arranque` y para fallar
+cuando el arranque supera el presupuesto o carga dependencias pesadas
+antes de tiempo.
+"""
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Sequence, Tuple
+
+# Lo que importa app.py antes de elegir una ruta
+MODULOS_ARRANQUE = ["streamlit", "auth.auth", "modules.database", "interfaces.sidebar"]
+
+# Lo que importa además cada ruta
+MODULOS_POR_RUTA = {
+    "Registro": ["modules.logic.ventas", "modules.logic.compras_gastos", "interfaces.registro.registro_ui"],
+    "Consulta": ["modules.logic.consultas", "interfaces.consultas.gastos_ui"],
+    "Análisis": ["modules.logic.analisis", "interfaces.analisis.analisis_ui"]
+}
+
+# Dependencias pesadas que solo deben cargarse en las rutas que las usan
+DIFERIDOS = {
+    "plotly.express": ("Consulta", "Análisis"),
+    "openpyxl": ()  # solo al leer un archivo subido
+}
+
+# Segundos de importación permitidos al arrancar (antes de elegir ruta)
+PRESUPUESTO_SEGUNDOS = 2.5
+
+# Mediciones por grupo; se toma la más rápida para descontar ruido
+REPETICIONES = 3
+
+_LINEA = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+def medir(modulos: Sequence[str], previos: Sequence[str] = ()) -> Tuple[float, Dict[str, float]]:
+    """(segundos, {módulo: segundos acumulados}) de importar `modulos` en frío.
+
+    Los `previos` se importan antes y no cuentan (p. ej. el arranque al medir una ruta).
+    """
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    codigo = "; ".join([
+        *(f"import {m}" for m in previos),
+        "import sys",
+        "sys.stderr.write('--medir--\\n')",
+        *(f"import {m}" for m in modulos)
+    ])
+    salida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=raiz, capture_output=True, text=True, check=True
+    ).stderr
+    acumulados = {}
+    total = 0
+    for linea in salida.split("--medir--\n", 1)[-1].splitlines():
+        coincidencia = _LINEA.match(linea)
+        if not coincidencia:
+            continue
+        _, acumulado, sangria, modulo = coincidencia.groups()
+        acumulados[modulo] = int(acumulado) / 1e6
+        if not sangria:
+            total += int(acumulado)
+    return total / 1e6, acumulados
+
+def _mejor(modulos: Sequence[str], previos: Sequence[str] = ()) -> Tuple[float, Dict[str, float]]:
+    return min((medir(modulos, previos) for _ in range(REPETICIONES)), key=lambda m: m[0])
+
+def informe(presupuesto: float = PRESUPUESTO_SEGUNDOS, mas_lentos: int = 10) -> Tuple[bool, List[str]]:
+    """Mide el arranque y cada ruta; devuelve (dentro del presupuesto, líneas del informe)"""
+    lineas = []
+    correcto = True
+
+    total, acumulados = _mejor(MODULOS_ARRANQUE)
+    lineas.append(f"Arranque: {total:.3f}s (presupuesto {presupuesto:.3f}s)")
+    for modulo, segundos in sorted(acumulados.items(), key=lambda m: -m[1])[:mas_lentos]:
+        lineas.append(f"    {segundos:8.3f}s  {modulo}")
+    if total > presupuesto:
+        correcto = False
+        lineas.append(f"❌ El arranque supera el presupuesto en {total - presupuesto:.3f}s")
+
+    cargados = {"": set(acumulados)}
+    for ruta, modulos in MODULOS_POR_RUTA.items():
+        segundos, acumulados_ruta = _mejor(modulos, MODULOS_ARRANQUE)
+        cargados[ruta] = set(acumulados_ruta)
+        lineas.append(f"Ruta {ruta}: +{segundos:.3f}s")
+
+    for modulo, rutas in DIFERIDOS.items():
+        for ruta, modulos in cargados.items():
+            if ruta not in rutas and modulo in modulos:
+                correcto = False
+                lineas.append(f"❌ {modulo} se importa {'al arrancar' if not ruta else f'en la ruta {ruta}'}")
+
+    return correcto, lineas
@@ -0,0 +1,68 @@
+"""Consultas concurrentes con el cliente asíncrono de Supabase.
+
+Streamlit ejecuta cada script en un hilo sin event loop, así que el cliente
+asíncrono vive en un loop propio dentro de un hilo en segundo plano. Las
+páginas entregan varias consultas independientes a `reunir`, que las lanza
+con `asyncio.gather`: la espera total es la de la más lenta, no la suma.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from supabase import AsyncClient, acreate_client
+
+from modules.paginacion import TAMANO_PAGINA
+
+# Tiempo máximo de espera de un grupo de consultas
+TIMEOUT_SEGUNDOS = 60
+
+Consulta = Callable[[AsyncClient], Awaitable[Any]]
+
+class ConsultasConcurrentes:
+    """Event loop dedicado con un AsyncClient compartido por todo el proceso"""
+
+    def __init__(self, url: str, key: str, timeout: float = TIMEOUT_SEGUNDOS):
+        self.url = url
+        self.key = key
+        self.timeout = timeout
+        self._cliente: Optional[AsyncClient] = None
+        self._loop = asyncio.new_event_loop()
+        self._hilo = threading.Thread(target=self._loop.run_forever, name="supabase-async", daemon=True)
+        self._hilo.start()
+
+    async def _obtener_cliente(self) -> AsyncClient:
+        # Solo se ejecuta dentro del loop: no hay carreras al crearlo
+        if self._cliente is None:
+            self._cliente = await acreate_client(self.url, self.key)
+        return self._cliente
+
+    async def _reunir(self, consultas: Dict[str, Consulta]) -> Dict[str, Any]:
+        cliente = await self._obtener_cliente()
+        resultados = await asyncio.gather(*(consulta(cliente) for consulta in consultas.values()))
+        return dict(zip(consultas, resultados))
+
+    def reunir(self, consultas: Dict[str, Consulta]) -> Dict[str, Any]:
+        """Ejecuta en paralelo `{nombre: consulta}` y devuelve `{nombre: resultado}`.
+
+        Cada consulta recibe el AsyncClient, p. ej.
+        `lambda c: c.table('compras').select('categoria').execute()`.
+        Si alguna falla se propaga su excepción.
+        """
+        futuro = asyncio.run_coroutine_threadsafe(self._reunir(consultas), self._loop)
+        return futuro.result(timeout=self.timeout)
+
+async def leer_paginado(construir: Callable[[], Any], tamano_pagina: int = TAMANO_PAGINA) -> List[Dict]:
+    """Todas las filas de una consulta asíncrona, pidiéndolas por rangos.
+
+    Versión asíncrona de `paginacion.iter_rangos`: `construir` devuelve la
+    consulta sin `.range()` y con un orden estable.
+    """
+    filas: List[Dict] = []
+    inicio = 0
+    while True:
+        respuesta = await construir().range(inicio, inicio + tamano_pagina - 1).execute()
+        if not respuesta.data:
+            return filas
+        filas.extend(respuesta.data)
+        # Como en iter_rangos: se avanza lo recibido (el max-rows puede ser menor)
+        inicio += len(respuesta.data)
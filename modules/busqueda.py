@@ -0,0 +1,52 @@
+"""Búsqueda aproximada local, equivalente a las funciones buscar_<tabla> de Postgres.
+
+Se usa cuando la búsqueda indexada no está disponible (esquema sin migrar o
+pruebas sin base de datos): mismas reglas de normalización y mismo orden.
+"""
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+
+def normalizar(texto: Optional[str]) -> str:
+    """Minúsculas y sin acentos (como f_unaccent(lower(...)))"""
+    descompuesto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in descompuesto if not unicodedata.combining(c)).lower()
+
+def _trigramas(texto: str) -> set:
+    # pg_trgm rellena cada palabra con dos espacios delante y uno detrás
+    trigramas = set()
+    for palabra in texto.split():
+        relleno = f"  {palabra} "
+        trigramas.update(relleno[i:i + 3] for i in range(len(relleno) - 2))
+    return trigramas
+
+def similitud_palabra(termino: str, documento: str) -> float:
+    """Aproximación de word_similarity: mejor coincidencia del término con una palabra del documento"""
+    buscados = _trigramas(termino)
+    if not buscados:
+        return 0.0
+    # Proporción de trigramas del término presentes en la mejor palabra
+    return max(
+        (len(buscados & _trigramas(palabra)) / len(buscados) for palabra in documento.split()),
+        default=0.0
+    )
+
+# Umbral por defecto del operador <% de pg_trgm
+UMBRAL_SIMILITUD = 0.6
+
+def buscar_local(
+    registros: Iterable[Dict],
+    termino: str,
+    limite: Optional[int] = None,
+    umbral: float = UMBRAL_SIMILITUD
+) -> List[Dict]:
+    """Filtra y ordena por relevancia registros con `producto`/`descripcion`"""
+    buscado = normalizar(termino)
+    resultados = []
+    for registro in registros:
+        documento = normalizar(f"{registro.get('producto') or ''} {registro.get('descripcion') or ''}")
+        rango = 1.0 if buscado in documento else similitud_palabra(buscado, documento)
+        if rango >= umbral:
+            resultados.append((rango, registro.get('fecha') or '', registro))
+    
+    resultados.sort(key=lambda r: (r[0], r[1]), reverse=True)
+    return [registro for _, _, registro in resultados[:limite]]
@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Sequence, Tuple
+
+# Valores por defecto del cache compartido de consultas
+MAX_ENTRADAS = 128
+TTL_SEGUNDOS = 300
+
+class CacheConsultas:
+    """Cache LRU con TTL para resultados de consultas, compartido entre sesiones.
+
+    Cada entrada recuerda su tabla y su rango de fechas, de modo que una
+    escritura solo invalida las consultas cuyo rango contiene la fecha escrita.
+    """
+
+    def __init__(self, max_entradas: int = MAX_ENTRADAS, ttl: float = TTL_SEGUNDOS):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._entradas: "OrderedDict[Hashable, Tuple[float, str, Optional[str], Optional[str], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def clave(tabla: str, filtros: Dict, columnas: Optional[Sequence[str]] = None) -> Hashable:
+        """Normaliza los filtros para que consultas equivalentes compartan entrada"""
+        normalizados = {}
+        for campo, valor in filtros.items():
+            if isinstance(valor, str):
+                valor = valor.strip()
+                # Los filtros de texto se aplican con ilike: mayúsculas no importan
+                if campo in ("categoria", "busqueda", "search"):
+                    valor = valor.lower()
+            if valor in (None, ""):
+                continue
+            normalizados[campo] = valor
+        return (
+            tabla,
+            tuple(sorted(normalizados.items())),
+            tuple(columnas) if columnas else None
+        )
+
+    def obtener(self, clave: Hashable):
+        """Devuelve el valor cacheado o None si no existe o expiró"""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            if time.monotonic() - entrada[0] > self.ttl:
+                del self._entradas[clave]
+                return None
+            self._entradas.move_to_end(clave)
+            return entrada[4]
+
+    def guardar(self, clave: Hashable, tabla: str, filtros: Dict, valor: Any):
+        with self._lock:
+            self._entradas[clave] = (
+                time.monotonic(),
+                tabla,
+                filtros.get("fecha_inicio"),
+                filtros.get("fecha_fin"),
+                valor
+            )
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def invalidar(self, tabla: str, fechas: Optional[Sequence[str]] = None):
+        """Elimina las entradas de `tabla` cuyo rango incluye alguna de `fechas`.
+
+        Sin fechas se invalida la tabla completa.
+        """
+        with self._lock:
+            for clave, (_, tabla_entrada, inicio, fin, _) in list(self._entradas.items()):
+                if tabla_entrada != tabla:
+                    continue
+                if fechas is None or any(
+                    (inicio is None or inicio <= fecha) and (fin is None or fecha <= fin)
+                    for fecha in fechas
+                ):
+                    del self._entradas[clave]
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
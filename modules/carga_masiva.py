@@ -0,0 +1,189 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+import httpx
+from postgrest.exceptions import APIError
+from postgrest.types import ReturnMethod
+
+# Configuración por defecto del cargador
+TAMANO_LOTE = 500
+TRABAJADORES = 4
+REINTENTOS = 3
+ESPERA_BASE = 0.5
+
+# Clases SQLSTATE transitorias: conexión, serialización/deadlock, recursos y cancelaciones (timeouts)
+_CLASES_REINTENTABLES = ("08", "40", "53", "57")
+
+# Estados HTTP de la pasarela cuando la respuesta no es JSON (PostgREST usa el estado como código)
+_HTTP_REINTENTABLES = ("500", "502", "503", "504")
+
+# Lotes confirmados por carga, compartidos entre reruns del proceso
+_progreso: Dict[str, Set[int]] = {}
+_progreso_lock = threading.Lock()
+
+@dataclass
+class ResultadoCarga:
+    filas: int
+    lotes: int
+    lotes_omitidos: int
+    segundos: float
+    # Filas guardadas en la cola local por falta de conexión (se envían después)
+    filas_en_cola: int = 0
+    # Filas de lotes confirmados en un intento anterior (omitidos al reanudar)
+    filas_previas: int = 0
+
+    @property
+    def filas_totales(self) -> int:
+        return self.filas + self.filas_previas
+
+    @property
+    def filas_por_segundo(self) -> float:
+        return self.filas / self.segundos if self.segundos > 0 else float(self.filas)
+
+class ErrorCarga(ValueError):
+    """Fallo de una carga; los lotes confirmados se conservan para reanudar"""
+
+    def __init__(self, mensaje: str, lotes_confirmados: int):
+        super().__init__(mensaje)
+        self.lotes_confirmados = lotes_confirmados
+
+def es_reintentable(error: Exception) -> bool:
+    if isinstance(error, httpx.TransportError):
+        return True
+    if isinstance(error, APIError):
+        codigo = str(error.code or "")
+        if len(codigo) == 5:
+            return codigo.startswith(_CLASES_REINTENTABLES)
+        return codigo in _HTTP_REINTENTABLES
+    return False
+
+class CargaMasiva:
+    """Inserta registros por lotes sobre un pool de hilos, con reintentos y reanudación.
+
+    Cada lote se identifica por su posición dentro de la carga. Si una carga
+    falla, volver a llamar a `cargar` con el mismo `id_carga` omite los lotes
+    ya confirmados.
+    """
+
+    def __init__(
+        self,
+        db,
+        tamano_lote: int = TAMANO_LOTE,
+        trabajadores: int = TRABAJADORES,
+        reintentos: int = REINTENTOS,
+        espera_base: float = ESPERA_BASE
+    ):
+        self.db = db
+        self.tamano_lote = tamano_lote
+        self.trabajadores = trabajadores
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+
+    @staticmethod
+    def en_progreso(id_carga: str) -> bool:
+        """Indica si existe una carga parcial pendiente de reanudar"""
+        with _progreso_lock:
+            return id_carga in _progreso
+
+    @staticmethod
+    def lotes_confirmados(id_carga: str) -> Set[int]:
+        """Posiciones de los lotes ya insertados de una carga parcial"""
+        with _progreso_lock:
+            return set(_progreso.get(id_carga, ()))
+
+    @staticmethod
+    def descartar(id_carga: str):
+        with _progreso_lock:
+            _progreso.pop(id_carga, None)
+
+    def _lotes(self, registros: Iterable[Dict]) -> Iterator[List[Dict]]:
+        iterador = iter(registros)
+        while True:
+            lote = list(islice(iterador, self.tamano_lote))
+            if not lote:
+                return
+            yield lote
+
+    def _insertar_lote(self, tabla: str, lote: List[Dict], conflicto: Optional[str] = None) -> int:
+        for intento in range(self.reintentos + 1):
+            try:
+                if conflicto:
+                    # Un lote que llegó pero cuya respuesta se perdió no se duplica al reintentar
+                    self.db.client.table(tabla).upsert(
+                        lote, returning=ReturnMethod.minimal, on_conflict=conflicto, ignore_duplicates=True
+                    ).execute()
+                else:
+                    self.db.client.table(tabla).insert(lote, returning=ReturnMethod.minimal).execute()
+                return len(lote)
+            except Exception as e:
+                if intento == self.reintentos or not es_reintentable(e):
+                    raise
+                time.sleep(self.espera_base * 2 ** intento)
+
+    def cargar(
+        self,
+        tabla: str,
+        registros: Iterable[Dict],
+        id_carga: str,
+        conflicto: Optional[str] = None
+    ) -> ResultadoCarga:
+        """Inserta `registros` (cualquier iterable, se consume en streaming) en `tabla`.
+
+        Con `conflicto` (columnas únicas) se hace upsert ignorando duplicados.
+        """
+        inicio = time.perf_counter()
+        with _progreso_lock:
+            confirmados = _progreso.setdefault(id_carga, set())
+            omitir = set(confirmados)
+
+        filas = lotes = previas = 0
+        error = None
+        pendientes = {}
+
+        with ThreadPoolExecutor(max_workers=self.trabajadores) as pool:
+            def recoger():
+                nonlocal filas, error
+                listos, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    indice = pendientes.pop(futuro)
+                    try:
+                        filas += futuro.result()
+                    except Exception as e:
+                        error = error or e
+                        continue
+                    with _progreso_lock:
+                        confirmados.add(indice)
+
+            for indice, lote in enumerate(self._lotes(registros)):
+                lotes += 1
+                if indice in omitir:
+                    previas += len(lote)
+                    continue
+                # Como máximo dos lotes en cola por trabajador: la memoria no crece con el archivo
+                while len(pendientes) >= self.trabajadores * 2:
+                    recoger()
+                if error:
+                    break
+                pendientes[pool.submit(self._insertar_lote, tabla, lote, conflicto)] = indice
+
+            while pendientes:
+                recoger()
+
+        if error:
+            raise ErrorCarga(
+                f"{len(confirmados)} lotes confirmados; reintente para continuar. Detalle: {error}",
+                len(confirmados)
+            ) from error
+
+        self.descartar(id_carga)
+        return ResultadoCarga(
+            filas=filas,
+            lotes=lotes,
+            lotes_omitidos=len(omitir),
+            segundos=time.perf_counter() - inicio,
+            filas_previas=previas
+        )
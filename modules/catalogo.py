@@ -0,0 +1,90 @@
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+import httpx
+from postgrest.exceptions import APIError
+
+from modules.paginacion import iter_rangos
+
+# Opciones fijas de los formularios (el catálogo añade las que aparezcan en los datos)
+CATEGORIAS_BASE = ["Mercancía", "Servicios", "Equipos", "Nómina", "Otros"]
+UNIDADES_BASE = ["kg", "litro", "unidad", "paquete"]
+
+# Cada cuánto se consulta la versión del catálogo en Supabase
+COMPROBACION_SEGUNDOS = 30
+
+class Catalogo:
+    """Valores conocidos de categorías, productos, proveedores y unidades.
+
+    La tabla `catalogo` la mantienen triggers de Postgres al insertar, y
+    `catalogo_version` cambia solo cuando aparece un valor nuevo. En el
+    proceso se guarda una copia que se recarga entera únicamente si la
+    versión cambió, así que cada consulta normal cuesta una fila.
+    """
+
+    def __init__(self, client, comprobacion: float = COMPROBACION_SEGUNDOS):
+        self.client = client
+        self.comprobacion = comprobacion
+        self._valores: Dict[str, List[str]] = {}
+        self._version: Optional[int] = None
+        self._comprobado_en: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _leer_version(self) -> Optional[int]:
+        filas = self.client.table('catalogo_version').select('version').limit(1).execute().data
+        return filas[0]['version'] if filas else None
+
+    def _cargar(self) -> Dict[str, List[str]]:
+        valores: Dict[str, List[str]] = {}
+        paginas = iter_rangos(
+            lambda: self.client.table('catalogo')
+            .select('tipo,valor')
+            .order('usos', desc=True)
+            .order('tipo')
+            .order('valor')
+        )
+        for pagina in paginas:
+            for fila in pagina:
+                valores.setdefault(fila['tipo'], []).append(fila['valor'])
+        return valores
+
+    def _actualizar(self):
+        with self._lock:
+            if self._comprobado_en is not None and time.monotonic() - self._comprobado_en < self.comprobacion:
+                return
+            # Se marca antes de consultar: las demás sesiones siguen con los valores
+            # actuales en vez de esperar (o repetir) esta comprobación
+            self._comprobado_en = time.monotonic()
+            version_anterior = self._version
+
+        # La red se espera sin el lock
+        try:
+            version = self._leer_version()
+            if version is not None and version == version_anterior:
+                return
+            valores = self._cargar()
+        except (APIError, httpx.HTTPError) as e:
+            # Esquema sin migrar o sin conexión: se siguen usando los últimos valores
+            # cargados (o solo las opciones fijas) y se reintenta tras `comprobacion`
+            print(f"Catálogo no disponible: {str(e)}")
+            return
+
+        with self._lock:
+            self._valores = valores
+            self._version = version
+
+    def valores(self, tipo: str) -> List[str]:
+        """Valores de `tipo` ordenados de más a menos usados"""
+        self._actualizar()
+        return list(self._valores.get(tipo, []))
+
+    def opciones(self, tipo: str, base: Sequence[str] = ()) -> List[str]:
+        """`base` en su orden seguido del resto de valores conocidos, alfabéticamente"""
+        extra = sorted(set(self.valores(tipo)) - set(base), key=str.lower)
+        return [*base, *extra]
+
+    def invalidar(self):
+        """Fuerza comprobar la versión en el próximo acceso (tras registrar un valor)"""
+        with self._lock:
+            self._comprobado_en = None
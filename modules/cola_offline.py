@@ -0,0 +1,242 @@
+"""Cola local (SQLite) de registros pendientes de enviar a Supabase.
+
+Los formularios escriben primero aquí y responden al momento; un hilo en
+segundo plano vacía la cola en orden, por lotes y con espera exponencial
+cuando la conexión falla. Cada registro lleva una `clave_idempotencia`
+única en Supabase, así que reenviar un lote que ya llegó no lo duplica.
+"""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional
+
+from postgrest.types import ReturnMethod
+
+from modules.carga_masiva import es_reintentable
+
+# Registros enviados por petición
+TAMANO_LOTE = 500
+
+# Segundos entre intentos de vaciado cuando no hay avisos nuevos
+INTERVALO = 5
+
+# Espera máxima entre reintentos tras fallos de red
+ESPERA_MAXIMA = 120
+
+# Los registros ya enviados se conservan este tiempo (para los contadores)
+RETENCION_ENVIADOS = 7 * 24 * 3600
+
+CONFLICTO_IDEMPOTENCIA = "clave_idempotencia"
+
+def clave_idempotencia(*partes) -> str:
+    """Clave determinista a partir de `partes` (uuid aleatorio si no se dan)"""
+    if not partes:
+        return str(uuid.uuid4())
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, ":".join(map(str, partes))))
+
+class ColaRegistros:
+    """Registro de escritura anticipada con sincronización en segundo plano.
+
+    Las entradas se envían estrictamente en el orden en que se encolaron: un
+    fallo de red detiene el vaciado hasta el siguiente intento, de modo que
+    una entrada posterior (p. ej. cerrar un día de ventas) nunca llega antes
+    que las filas de las que depende. Si alguna de esas filas se rechaza, el
+    cierre de su grupo tampoco se envía y queda como `error`.
+    """
+
+    def __init__(self, db, ruta: str, intervalo: float = INTERVALO):
+        self.db = db
+        self.ruta = ruta
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._aviso = threading.Event()
+        self._espera = 0.0
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        with self._conexion:
+            self._conexion.execute("""
+                CREATE TABLE IF NOT EXISTS pendientes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tabla TEXT NOT NULL,
+                    conflicto TEXT NOT NULL,
+                    fusionar INTEGER NOT NULL DEFAULT 0,
+                    datos TEXT NOT NULL,
+                    grupo TEXT,
+                    cierre INTEGER NOT NULL DEFAULT 0,
+                    estado TEXT NOT NULL DEFAULT 'pendiente',
+                    intentos INTEGER NOT NULL DEFAULT 0,
+                    ultimo_error TEXT,
+                    creado_en REAL NOT NULL,
+                    enviado_en REAL
+                )
+            """)
+            # Colas creadas antes de existir los grupos
+            existentes = {fila[1] for fila in self._conexion.execute("PRAGMA table_info(pendientes)")}
+            if "grupo" not in existentes:
+                self._conexion.execute("ALTER TABLE pendientes ADD COLUMN grupo TEXT")
+                self._conexion.execute("ALTER TABLE pendientes ADD COLUMN cierre INTEGER NOT NULL DEFAULT 0")
+            self._conexion.execute("CREATE INDEX IF NOT EXISTS idx_pendientes_estado ON pendientes (estado, id)")
+            self._conexion.execute("CREATE INDEX IF NOT EXISTS idx_pendientes_grupo ON pendientes (grupo, estado)")
+        self._hilo = threading.Thread(target=self._trabajar, name="cola-registros", daemon=True)
+        self._hilo.start()
+
+    def encolar(self, tabla: str, registro: Dict) -> str:
+        """Guarda `registro` para enviarlo a `tabla`; devuelve su clave de idempotencia"""
+        registro = {**registro, "clave_idempotencia": registro.get("clave_idempotencia") or clave_idempotencia()}
+        self.encolar_lote(tabla, [registro])
+        return registro["clave_idempotencia"]
+
+    def encolar_lote(
+        self,
+        tabla: str,
+        registros: Iterable[Dict],
+        conflicto: str = CONFLICTO_IDEMPOTENCIA,
+        fusionar: bool = False,
+        grupo: Optional[Callable[[Dict], str]] = None,
+        cierre: bool = False
+    ) -> int:
+        """Encola varias filas en una sola transacción.
+
+        `conflicto` son las columnas únicas del upsert; con `fusionar` las filas
+        existentes se actualizan en vez de ignorarse. `grupo` da el grupo de cada
+        fila; con `cierre` las filas solo se envían si ninguna entrada anterior
+        de su grupo fue rechazada.
+        """
+        ahora = time.time()
+        filas = [
+            (
+                tabla, conflicto, int(fusionar), json.dumps(registro, default=str),
+                grupo(registro) if grupo else None, int(cierre), ahora
+            )
+            for registro in registros
+        ]
+        with self._lock, self._conexion:
+            self._conexion.executemany(
+                "INSERT INTO pendientes (tabla, conflicto, fusionar, datos, grupo, cierre, creado_en) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                filas
+            )
+        self._aviso.set()
+        return len(filas)
+
+    def contadores(self) -> Dict[str, int]:
+        """Entradas por estado: pendiente, enviado y error"""
+        with self._lock:
+            filas = self._conexion.execute("SELECT estado, COUNT(*) FROM pendientes GROUP BY estado").fetchall()
+        return {"pendiente": 0, "enviado": 0, "error": 0, **dict(filas)}
+
+    def _siguiente_lote(self) -> List[tuple]:
+        """Primeras entradas pendientes consecutivas con el mismo destino"""
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT id, tabla, conflicto, fusionar, datos, grupo, cierre FROM pendientes "
+                "WHERE estado = 'pendiente' ORDER BY id LIMIT ?",
+                (TAMANO_LOTE,)
+            ).fetchall()
+        if not filas:
+            return []
+        destino = (*filas[0][1:4], filas[0][6])
+        lote = []
+        for fila in filas:
+            if (*fila[1:4], fila[6]) != destino:
+                break
+            lote.append(fila)
+        return lote
+
+    def _enviar(self, tabla: str, conflicto: str, fusionar: bool, registros: List[Dict]):
+        self.db.client.table(tabla).upsert(
+            registros,
+            returning=ReturnMethod.minimal,
+            on_conflict=conflicto,
+            ignore_duplicates=not fusionar,
+            default_to_null=False
+        ).execute()
+
+    def _marcar(self, ids: List[int], estado: str, error: Optional[str] = None):
+        marcadores = ", ".join("?" for _ in ids)
+        with self._lock, self._conexion:
+            self._conexion.execute(
+                f"UPDATE pendientes SET estado = ?, ultimo_error = ?, intentos = intentos + 1, "
+                f"enviado_en = CASE WHEN ? = 'enviado' THEN ? END WHERE id IN ({marcadores})",
+                (estado, error, estado, time.time(), *ids)
+            )
+
+    def _rechazados(self, grupos: Iterable[str]) -> Dict[str, int]:
+        """Entradas con error por grupo (solo los grupos que tienen alguna)"""
+        grupos = list(grupos)
+        if not grupos:
+            return {}
+        marcadores = ", ".join("?" for _ in grupos)
+        with self._lock:
+            filas = self._conexion.execute(
+                f"SELECT grupo, COUNT(*) FROM pendientes WHERE estado = 'error' AND grupo IN ({marcadores}) "
+                "GROUP BY grupo",
+                grupos
+            ).fetchall()
+        return dict(filas)
+
+    def sincronizar(self) -> int:
+        """Envía lo pendiente en orden; devuelve cuántas entradas se enviaron.
+
+        Un error de red se propaga (para esperar y reintentar); un error de
+        datos marca la entrada como `error` y el vaciado continúa.
+        """
+        enviados = 0
+        while True:
+            lote = self._siguiente_lote()
+            if not lote:
+                break
+            _, tabla, conflicto, fusionar = lote[0][:4]
+            if lote[0][6]:
+                # Las entradas anteriores del grupo ya se enviaron o se rechazaron (el orden lo garantiza)
+                rechazados = self._rechazados({fila[5] for fila in lote if fila[5]})
+                for fila in lote:
+                    if fila[5] in rechazados:
+                        self._marcar(
+                            [fila[0]], "error",
+                            f"No se envía el cierre: {rechazados[fila[5]]} registros del grupo {fila[5]} fueron rechazados"
+                        )
+                lote = [fila for fila in lote if fila[5] not in rechazados]
+                if not lote:
+                    continue
+            registros = [json.loads(fila[4]) for fila in lote]
+            try:
+                self._enviar(tabla, conflicto, bool(fusionar), registros)
+                self._marcar([fila[0] for fila in lote], "enviado")
+                enviados += len(lote)
+            except Exception as e:
+                if es_reintentable(e):
+                    raise
+                # Se reenvía de uno en uno para aislar la fila inválida
+                for fila, registro in zip(lote, registros):
+                    try:
+                        self._enviar(tabla, conflicto, bool(fusionar), [registro])
+                        self._marcar([fila[0]], "enviado")
+                        enviados += 1
+                    except Exception as error_fila:
+                        if es_reintentable(error_fila):
+                            raise
+                        self._marcar([fila[0]], "error", str(error_fila))
+            finally:
+                fechas = {registro["fecha"] for registro in registros if registro.get("fecha")}
+                self.db.cache.invalidar(tabla, fechas or None)
+
+        with self._lock, self._conexion:
+            self._conexion.execute(
+                "DELETE FROM pendientes WHERE estado = 'enviado' AND enviado_en < ?",
+                (time.time() - RETENCION_ENVIADOS,)
+            )
+        return enviados
+
+    def _trabajar(self):
+        while True:
+            self._aviso.wait(timeout=max(self.intervalo, self._espera))
+            self._aviso.clear()
+            try:
+                self.sincronizar()
+                self._espera = 0.0
+            except Exception as e:
+                self._espera = min(ESPERA_MAXIMA, max(self.intervalo, self._espera * 2))
+                print(f"Cola de registros sin sincronizar (reintento en {self._espera:.0f}s): {str(e)}")
@@ -0,0 +1,69 @@
+import threading
+from typing import Dict, Optional, Tuple
+
+import httpx
+import streamlit as st
+from postgrest import SyncPostgrestClient
+from postgrest.utils import SyncClient
+from supabase import Client, ClientOptions
+
+# Conexiones HTTP por cliente (configurable con SUPABASE_POOL_SIZE en secrets)
+TAMANO_POOL = 10
+
+# Segundos que una conexión ociosa se mantiene abierta para reutilizarla
+KEEPALIVE_SEGUNDOS = 60
+
+_clientes: Dict[Tuple[str, str], Client] = {}
+_lock = threading.Lock()
+
+def _tamano_pool() -> int:
+    try:
+        return int(st.secrets.get("SUPABASE_POOL_SIZE", TAMANO_POOL))
+    except FileNotFoundError:
+        return TAMANO_POOL
+
+class _PostgrestConPool(SyncPostgrestClient):
+    """Cliente PostgREST con pool de conexiones keep-alive y respuestas comprimidas"""
+
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None) -> SyncClient:
+        tamano = _tamano_pool()
+        return SyncClient(
+            base_url=base_url,
+            headers={**headers, "Accept-Encoding": "gzip, deflate"},
+            timeout=timeout,
+            verify=verify,
+            proxy=proxy,
+            follow_redirects=True,
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=tamano,
+                max_keepalive_connections=tamano,
+                keepalive_expiry=KEEPALIVE_SEGUNDOS
+            )
+        )
+
+class _ClienteConPool(Client):
+    @staticmethod
+    def _init_postgrest_client(rest_url, headers, schema, timeout, verify=True, proxy=None):
+        return _PostgrestConPool(
+            rest_url,
+            headers=headers,
+            schema=schema,
+            timeout=timeout,
+            verify=verify,
+            proxy=proxy
+        )
+
+def obtener_cliente(url: Optional[str] = None, key: Optional[str] = None) -> Client:
+    """Cliente Supabase único por proceso para cada (url, key).
+
+    Todas las sesiones y módulos (auth, registro de usuarios, DatabaseManager)
+    comparten el mismo cliente y, con él, sus conexiones HTTP ya abiertas.
+    """
+    url = (url or st.secrets["SUPABASE_URL"]).strip()
+    key = (key or st.secrets["SUPABASE_KEY"]).strip()
+    
+    with _lock:
+        if (url, key) not in _clientes:
+            _clientes[(url, key)] = _ClienteConPool.create(url, key, ClientOptions())
+        return _clientes[(url, key)]
@@ -1,6 +1,28 @@
 import streamlit as st
-from supabase import create_client, Client
-from typing import Dict
+from supabase import Client
+from modules.cache import CacheConsultas
+from modules.conexion import obtener_cliente
+from modules.dias_registrados import DiasRegistrados
+from modules.migraciones import RESUMENES, aplicar_migraciones
+from modules.replica import ReplicaLocal
+from modules.cola_offline import ColaRegistros
+from modules.async_db import ConsultasConcurrentes
+from modules.catalogo import Catalogo
+from modules.salud import MonitorSalud
+from modules.busqueda import buscar_local
+from modules.paginacion import TAMANO_PAGINA, iter_rangos
+from postgrest.exceptions import APIError
+from postgrest.types import CountMethod
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+# Resultados que devuelve como máximo una búsqueda por texto
+LIMITE_BUSQUEDA = 500
+
+# Archivo por defecto de la cola local de registros (COLA_REGISTROS en secrets; vacío la desactiva)
+RUTA_COLA = "cola_registros.sqlite3"
+
+# Errores de PostgREST cuando la función de búsqueda aún no existe en el esquema
+_FUNCION_INEXISTENTE = ("PGRST202", "42883")
 
 class DatabaseManager:
     def __init__(self):
@@ -8,65 +30,35 @@ class DatabaseManager:
         self.url = st.secrets["SUPABASE_URL"].strip() 
         self.key = st.secrets["SUPABASE_KEY"].strip()
         
-        # Inicializar cliente Supabase
-        self.client: Client = create_client(self.url, self.key)
-        
-        # Crear tablas si no existen
-        self._initialize_tables()
-
-    def _initialize_tables(self):
-        """Crear todas las tablas necesarias"""
-        
-        tables =  {
-            "compras": """
-                CREATE TABLE IF NOT EXISTS compras (
-                    id SERIAL PRIMARY KEY,
-                    fecha DATE NOT NULL,
-                    categoria VARCHAR(50) NOT NULL DEFAULT 'Mercancía',
-                    producto VARCHAR(100),
-                    cantidad NUMERIC(10,3) NOT NULL DEFAULT 1,
-                    unidad_medida VARCHAR(20) NOT NULL DEFAULT 'unidad',
-                    monto NUMERIC(10,2) NOT NULL,
-                    proveedor VARCHAR(100),
-                    descripcion TEXT,
-                    created_at TIMESTAMP DEFAULT NOW()
-                )
-            """,
-
-            "gastos": """
-                CREATE TABLE IF NOT EXISTS gastos (
-                    id SERIAL PRIMARY KEY,
-                    fecha DATE NOT NULL,
-                    producto VARCHAR(100),
-                    categoria VARCHAR(50) NOT NULL,
-                    monto NUMERIC(10,2) NOT NULL,
-                    descripcion TEXT,
-                    proveedor VARCHAR(100),
-                    created_at TIMESTAMP DEFAULT NOW()
-                )
-            """,
-
-            "ventas": """
-                CREATE TABLE IF NOT EXISTS ventas (
-                    id SERIAL PRIMARY KEY,
-                    fecha DATE NOT NULL,
-                    grupo VARCHAR(50) NOT NULL,
-                    nombre VARCHAR(100) NOT NULL,
-                    cantidad INTEGER NOT NULL,
-                    venta NUMERIC(10,2) NOT NULL,
-                    entidad VARCHAR(20) NOT NULL CHECK (entidad IN ('restaurante', 'domicilio')),
-                    cliente VARCHAR(20) NOT NULL CHECK (cliente IN ('clientes', 'cuenta_casa')),
-                    created_at TIMESTAMP DEFAULT NOW()
-            )
-        """
-        }
+        # Cliente Supabase compartido por todo el proceso
+        self.client: Client = obtener_cliente(self.url, self.key)
+        
+        # Cliente asíncrono para lanzar en paralelo consultas independientes
+        self.concurrente = ConsultasConcurrentes(self.url, self.key)
+        
+        # Comprobación periódica de la conexión (latencias y errores) en segundo plano
+        self.salud = MonitorSalud(self.client)
+        
+        # Cache de consultas compartido por todas las sesiones (la instancia vive en cache_resource)
+        self.cache = CacheConsultas()
+        
+        # Libro de días de ventas importados
+        self.dias_ventas = DiasRegistrados(self.client)
+        
+        # Categorías, productos, proveedores y unidades para los formularios
+        self.catalogo = Catalogo(self.client)
+        
+        # Réplica local opcional para las consultas (REPLICA_LOCAL en secrets)
+        ruta_replica = st.secrets.get("REPLICA_LOCAL")
+        self.replica = ReplicaLocal(self, ruta_replica) if ruta_replica else None
+        
+        # Registros pendientes de enviar, sincronizados en segundo plano
+        ruta_cola = st.secrets.get("COLA_REGISTROS", RUTA_COLA)
+        self.cola = ColaRegistros(self, ruta_cola) if ruta_cola else None
+        
+        # Instalar o actualizar el esquema (solo las migraciones pendientes)
+        aplicar_migraciones(self.client)
 
-        for table, script in tables.items():
-                try:
-                    self.client.rpc('execute_sql', params={'query': script}).execute()
-                except Exception as e:
-                    print(f"Error creando tabla {table}: {str(e)}")
-    
     """ INSTERTAR DATOS"""
 
     def insert_registro(self, data: Dict):
@@ -81,71 +73,296 @@ class DatabaseManager:
         if not all(key in data for key in required):
             raise ValueError(f"Campos requeridos faltantes: {required}")
         
-        return self.client.table(table).insert(data).execute().data[0]
+        registro = self.client.table(table).insert(data).execute().data[0]
+        self.cache.invalidar(table, [data["fecha"]])
+        return registro
     
     def insert_venta(self, data: Dict) -> Dict:
-        return self.client.table('ventas').insert(data).execute().data[0]
+        registro = self.client.table('ventas').insert(data).execute().data[0]
+        self.cache.invalidar('ventas', [data["fecha"]])
+        return registro
     
     """OBTENER DATOS"""
     
     def get_categorias(self):
-        """Obtiene categorías únicas de ambas tablas"""
-        # Obtener categorías de compras
-        compras = self.client.table('compras').select('categoria').execute().data
-        categorias_compras = {item['categoria'] for item in compras}
-        
-        # Obtener categorías de gastos
-        gastos = self.client.table('gastos').select('categoria').execute().data
-        categorias_gastos = {item['categoria'] for item in gastos}
-        
-        # Combinar y ordenar
-        return sorted(categorias_compras.union(categorias_gastos))
+        """Categorías conocidas, leídas del catálogo (no recorre compras ni gastos)"""
+        return sorted(self.catalogo.valores('categoria'))
+
+    def execute_safe_query(self, table: str, filters: dict, columns: Optional[Sequence[str]] = None):
+        """Versión mejorada con logging de diagnóstico.
 
-    def execute_safe_query(self, table: str, filters: dict):
-        """Versión mejorada con logging de diagnóstico"""
+        `columns` limita las columnas pedidas a Supabase (por defecto todas).
+        """
         try:
             st.write("🔍 Parámetros de búsqueda recibidos:", filters)  # Debug 1
             
-            query = self.client.table(table).select("*")
+            def aplicar_filtros(query):
+                # Aplicar filtros con verificación de valores
+                if 'categoria' in filters:
+                    categoria = filters['categoria'].lower().strip()  # Normalización
+                    query = query.ilike("categoria", f"%{categoria}%")
+                    
+                if all(k in filters for k in ['fecha_inicio', 'fecha_fin']):
+                    query = (
+                        query
+                        .gte("fecha", filters['fecha_inicio'])
+                        .lte("fecha", filters['fecha_fin'])
+                    )
+                return query
             
-            # Aplicar filtros con verificación de valores
             if 'categoria' in filters:
-                categoria = filters['categoria'].lower().strip()  # Normalización
-                query = query.ilike("categoria", f"%{categoria}%")
-                st.write(f"✅ Filtro categoría aplicado: {categoria}")  # Debug 2
-                
+                st.write(f"✅ Filtro categoría aplicado: {filters['categoria'].lower().strip()}")  # Debug 2
             if all(k in filters for k in ['fecha_inicio', 'fecha_fin']):
-                query = (
-                    query
-                    .gte("fecha", filters['fecha_inicio'])
-                    .lte("fecha", filters['fecha_fin'])
-                )
                 st.write(f"📅 Rango fechas: {filters['fecha_inicio']} a {filters['fecha_fin']}")  # Debug 3
-                
             if 'search' in filters and filters['search']:
-                search_term = f"%{filters['search'].lower().strip()}%"
-                if table == "gastos":
-                    query = query.or_(f"producto.ilike.{search_term},descripcion.ilike.{search_term}")
-                else:
-                    query = query.ilike("producto", search_term)
-                st.write(f"🔎 Término búsqueda: {search_term}")  # Debug 4
+                st.write(f"🔎 Término búsqueda: {filters['search'].lower().strip()}")  # Debug 4
             
-            st.write("⚡ Consulta final:", query)  # Debug 5
-            result = query.execute()
+            if filters.get('search'):
+                # Búsqueda indexada por trigramas, ordenada por relevancia
+                datos = self.buscar(
+                    table,
+                    filters['search'].strip(),
+                    fecha_inicio=filters.get('fecha_inicio'),
+                    fecha_fin=filters.get('fecha_fin'),
+                    categoria=filters.get('categoria', '').lower().strip() or None,
+                    columns=columns
+                )
+            else:
+                datos = list(self.iter_registros(
+                    table,
+                    columnas=columns or "*",
+                    aplicar_filtros=aplicar_filtros
+                ))
             
-            st.write("📦 Datos crudos recibidos:", result.data)  # Debug 6
-            return result.data
+            st.write(f"📦 Filas recibidas: {len(datos)}")  # Debug 6
+            return datos
             
         except Exception as e:
             st.error(f"🧨 Error en consulta: {str(e)}")
             raise
 
+    def buscar(
+        self,
+        table: str,
+        termino: str,
+        fecha_inicio: Optional[str] = None,
+        fecha_fin: Optional[str] = None,
+        categoria: Optional[str] = None,
+        columns: Optional[Sequence[str]] = None,
+        limite: Optional[int] = LIMITE_BUSQUEDA
+    ) -> List[Dict]:
+        """Busca `termino` en producto/descripcion (sin acentos, tolerante a erratas).
+
+        Los resultados vienen ordenados por relevancia. Con `limite=None` se
+        devuelven todas las coincidencias (sin orden de relevancia).
+        """
+        params = {
+            'termino': termino,
+            'fecha_inicio': fecha_inicio,
+            'fecha_fin': fecha_fin,
+            'categoria': categoria
+        }
+        try:
+            if limite is None:
+                return list(self.iter_registros(
+                    table,
+                    columnas=columns or "*",
+                    consulta_base=lambda proyeccion: self.client.rpc(f'buscar_{table}', params).select(proyeccion)
+                ))
+            return (
+                self.client.rpc(f'buscar_{table}', {**params, 'limite': limite})
+                .select(",".join(columns) if columns else "*")
+                .execute()
+                .data
+            )
+        except APIError as e:
+            if e.code not in _FUNCION_INEXISTENTE:
+                raise
+        
+        # Esquema sin la función de búsqueda: mismo criterio calculado localmente
+        def aplicar_filtros(query):
+            if fecha_inicio and fecha_fin:
+                query = query.gte("fecha", fecha_inicio).lte("fecha", fecha_fin)
+            if categoria:
+                query = query.ilike("categoria", f"%{categoria}%")
+            return query
+        
+        columnas = [*columns, "producto", "descripcion"] if columns else "*"
+        return buscar_local(
+            self.iter_registros(table, columnas=columnas, aplicar_filtros=aplicar_filtros),
+            termino,
+            limite
+        )
+
+    def buscar_pagina(
+        self,
+        table: str,
+        termino: str,
+        fecha_inicio: Optional[str] = None,
+        fecha_fin: Optional[str] = None,
+        categoria: Optional[str] = None,
+        columns: Optional[Sequence[str]] = None,
+        orden: str = "fecha",
+        descendente: bool = True,
+        inicio: int = 0,
+        tamano: int = TAMANO_PAGINA
+    ) -> Tuple[List[Dict], int]:
+        """Una página de todas las coincidencias de `termino` (sin límite) y su total"""
+        params = {
+            'termino': termino,
+            'fecha_inicio': fecha_inicio,
+            'fecha_fin': fecha_fin,
+            'categoria': categoria
+        }
+        try:
+            query = self.client.postgrest.rpc(f'buscar_{table}', params).select(self._proyeccion(columns or "*"))
+            # `select` de una RPC reescribe Prefer y perdería el count pedido en `rpc`
+            query.headers["Prefer"] = f"return=representation,count={CountMethod.exact.value}"
+            respuesta = (
+                query
+                .order(orden, desc=descendente)
+                .order("id", desc=descendente)
+                .range(inicio, inicio + tamano - 1)
+                .execute()
+            )
+            return respuesta.data, respuesta.count or 0
+        except APIError as e:
+            if e.code not in _FUNCION_INEXISTENTE:
+                raise
+        
+        # Esquema sin la función de búsqueda: todas las coincidencias locales, ordenadas aquí
+        filas = self.buscar(table, termino, fecha_inicio, fecha_fin, categoria, columns, limite=None)
+        filas.sort(key=lambda fila: (fila.get(orden) is None, fila.get(orden)), reverse=descendente)
+        return filas[inicio:inicio + tamano], len(filas)
+
+    def iter_paginas(
+        self,
+        table: str,
+        columnas: Union[str, Sequence[str]] = "*",
+        aplicar_filtros: Optional[Callable] = None,
+        tamano_pagina: int = TAMANO_PAGINA,
+        consulta_base: Optional[Callable] = None,
+        desde_id: Optional[int] = None
+    ) -> Iterator[List[Dict]]:
+        """Recorre la tabla por páginas ordenadas por id (keyset, sin offsets).
+
+        `consulta_base` permite paginar otra fuente con columna id (p. ej. una
+        función RPC); recibe la proyección y devuelve la query sin filtros.
+        `desde_id` devuelve solo filas con id posterior (lecturas incrementales).
+        """
+        proyeccion = self._proyeccion(columnas)
+        ultimo_id = desde_id
+        
+        while True:
+            if consulta_base:
+                query = consulta_base(proyeccion)
+            else:
+                query = self.client.table(table).select(proyeccion)
+            if aplicar_filtros:
+                query = aplicar_filtros(query)
+            if ultimo_id is not None:
+                query = query.gt("id", ultimo_id)
+            
+            pagina = query.order("id").limit(tamano_pagina).execute().data
+            if not pagina:
+                return
+            
+            yield pagina
+            
+            # Una página corta no indica el final: el max-rows del servidor puede ser
+            # menor que `tamano_pagina`. Solo una página vacía lo confirma
+            ultimo_id = pagina[-1]["id"]
+
+    def iter_paginas_ordenadas(
+        self,
+        table: str,
+        orden: Sequence[str],
+        columnas: Union[str, Sequence[str]] = "*",
+        aplicar_filtros: Optional[Callable] = None,
+        tamano_pagina: int = TAMANO_PAGINA
+    ) -> Iterator[List[Dict]]:
+        """Recorre por rangos de offset una tabla o vista sin columna `id`.
+
+        Pensado para resultados ya agregados, que son pequeños.
+        """
+        if not isinstance(columnas, str):
+            columnas = ",".join(columnas)
+        
+        def construir():
+            query = self.client.table(table).select(columnas)
+            if aplicar_filtros:
+                query = aplicar_filtros(query)
+            for columna in orden:
+                query = query.order(columna)
+            return query
+        
+        return iter_rangos(construir, tamano_pagina)
+
+    def get_pagina(
+        self,
+        table: str,
+        columnas: Union[str, Sequence[str]],
+        aplicar_filtros: Optional[Callable] = None,
+        orden: str = "fecha",
+        descendente: bool = True,
+        inicio: int = 0,
+        tamano: int = TAMANO_PAGINA
+    ) -> Tuple[List[Dict], int]:
+        """Una página ordenada en el servidor y el total de filas que cumplen los filtros"""
+        query = self.client.table(table).select(self._proyeccion(columnas), count=CountMethod.exact)
+        if aplicar_filtros:
+            query = aplicar_filtros(query)
+        # `id` desempata: sin él las páginas pueden solaparse con valores repetidos
+        respuesta = (
+            query.order(orden, desc=descendente)
+            .order("id", desc=descendente)
+            .range(inicio, inicio + tamano - 1)
+            .execute()
+        )
+        return respuesta.data, respuesta.count or 0
+
+    def get_resumen(self, table: str, aplicar_filtros: Optional[Callable] = None) -> List[Dict]:
+        """Filas del resumen diario de `table` (sin días que quedaron a cero)"""
+        claves, _ = RESUMENES[table]
+        
+        def filtrar(query):
+            query = query.gt("registros", 0)
+            return aplicar_filtros(query) if aplicar_filtros else query
+        
+        return [
+            fila
+            for pagina in self.iter_paginas_ordenadas(
+                f"resumen_diario_{table}", claves, aplicar_filtros=filtrar
+            )
+            for fila in pagina
+        ]
+
+    def reconstruir_resumenes(self):
+        """Recalcula los resúmenes diarios desde las tablas originales (backfill)"""
+        self.client.rpc('reconstruir_resumenes').execute()
+        for table in RESUMENES:
+            self.cache.invalidar(table)
+
+    @staticmethod
+    def _proyeccion(columnas: Union[str, Sequence[str]]) -> str:
+        """Construye la lista de columnas del select; `id` siempre se incluye para paginar"""
+        if isinstance(columnas, str):
+            columnas = [c.strip() for c in columnas.split(",")]
+        if "*" in columnas:
+            return "*"
+        return ",".join(dict.fromkeys(["id", *columnas]))
+
+    def iter_registros(self, table: str, **kwargs) -> Iterator[Dict]:
+        """Itera fila a fila sobre iter_paginas"""
+        for pagina in self.iter_paginas(table, **kwargs):
+            yield from pagina
+
     # Métodos adicionales para acceso individual
     def get_compras(self):
-        return self.client.table('compras').select('*').execute().data
+        return list(self.iter_registros('compras'))
 
     def get_gastos(self):
-        return self.client.table('gastos').select('*').execute().data
+        return list(self.iter_registros('gastos'))
 
 
 
@@ -0,0 +1,120 @@
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Set, Tuple
+
+from postgrest.exceptions import APIError
+
+from modules.paginacion import iter_rangos
+
+# Segundos que el conjunto en memoria se considera al día
+TTL_SEGUNDOS = 60
+
+# Una reserva sin completar más antigua que esto se considera abandonada
+RESERVA_ABANDONADA = timedelta(minutes=30)
+
+ENTIDADES = ("restaurante", "domicilio")
+
+Dia = Tuple[str, str]
+
+class DiasRegistrados:
+    """Libro de días de ventas importados: una fila por (fecha, entidad).
+
+    La tabla `ventas_dias` tiene la pareja como clave primaria, así que dos
+    importaciones simultáneas del mismo día no pueden reservarlo a la vez. En
+    el proceso se mantiene una copia como conjunto para responder en O(1).
+    """
+
+    def __init__(self, client, ttl: float = TTL_SEGUNDOS):
+        self.client = client
+        self.ttl = ttl
+        self._dias: Set[Dia] = set()
+        self._cargado_en: Optional[float] = None
+        self._cargando = False
+        self._lock = threading.Lock()
+
+    def _conjunto(self) -> Set[Dia]:
+        with self._lock:
+            vigente = self._cargado_en is not None and time.monotonic() - self._cargado_en <= self.ttl
+            # Mientras otra sesión recarga se responde con la copia anterior en vez de esperarla
+            if vigente or (self._cargando and self._cargado_en is not None):
+                return self._dias
+            self._cargando = True
+
+        # La red se espera sin el lock: una petición colgada no bloquea a las demás sesiones
+        try:
+            paginas = iter_rangos(
+                lambda: self.client.table('ventas_dias').select('fecha,entidad').order('fecha').order('entidad')
+            )
+            dias = {(fila['fecha'], fila['entidad']) for pagina in paginas for fila in pagina}
+        finally:
+            with self._lock:
+                self._cargando = False
+
+        with self._lock:
+            self._dias = dias
+            self._cargado_en = time.monotonic()
+            return self._dias
+
+    def existe(self, fecha: str, entidad: str) -> bool:
+        return (fecha, entidad) in self._conjunto()
+
+    def existentes(self, pares: Iterable[Dia]) -> Set[Dia]:
+        return set(pares) & self._conjunto()
+
+    def faltantes(self, inicio: date, fin: date, entidades: Iterable[str] = ENTIDADES) -> List[Dia]:
+        """Días del rango (ambos incluidos) sin ventas registradas, por entidad"""
+        registrados = self._conjunto()
+        dias = []
+        for desplazamiento in range((fin - inicio).days + 1):
+            fecha = (inicio + timedelta(days=desplazamiento)).isoformat()
+            dias.extend((fecha, e) for e in entidades if (fecha, e) not in registrados)
+        return dias
+
+    def reservar(self, fecha: str, entidad: str) -> bool:
+        """Reserva el día antes de importar.
+
+        Devuelve True si se retomó una reserva abandonada (puede haber filas
+        parciales que limpiar). Lanza ValueError si el día ya está registrado
+        o lo está importando otra sesión.
+        """
+        try:
+            self.client.table('ventas_dias').insert({
+                'fecha': fecha,
+                'entidad': entidad,
+                'completo': False
+            }).execute()
+            recuperada = False
+        except APIError as e:
+            if e.code != '23505':  # unique_violation
+                raise
+            limite = (datetime.now(timezone.utc) - RESERVA_ABANDONADA).isoformat()
+            tomada = (
+                self.client.table('ventas_dias')
+                .update({'reservado_en': datetime.now(timezone.utc).isoformat()})
+                .match({'fecha': fecha, 'entidad': entidad, 'completo': False})
+                .lt('reservado_en', limite)
+                .execute()
+                .data
+            )
+            if not tomada:
+                raise ValueError(f"¡Ya existe registro para {entidad} en esta fecha!") from e
+            recuperada = True
+
+        with self._lock:
+            self._dias.add((fecha, entidad))
+        return recuperada
+
+    def completar(self, fecha: str, entidad: str, filas: int):
+        self.client.table('ventas_dias').update({
+            'completo': True,
+            'filas': filas
+        }).match({'fecha': fecha, 'entidad': entidad}).execute()
+
+    def liberar(self, fecha: str, entidad: str):
+        self.client.table('ventas_dias').delete().match({
+            'fecha': fecha,
+            'entidad': entidad
+        }).execute()
+        with self._lock:
+            self._dias.discard((fecha, entidad))
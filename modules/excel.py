@@ -0,0 +1,131 @@
+import hashlib
+from itertools import islice
+from typing import Iterator, List, MutableMapping
+
+import pandas as pd
+
+# Archivos parseados que se conservan como máximo por sesión
+MAX_ARCHIVOS = 4
+
+# A partir de este tamaño el archivo se lee en streaming en vez de cargarse entero
+UMBRAL_STREAMING = 2 * 1024 * 1024
+
+# Filas por lote al leer en streaming
+TAMANO_LOTE_EXCEL = 2000
+
+def leer_excel(origen) -> pd.DataFrame:
+    """Excel completo con la misma normalización que `LectorExcel`.
+
+    Encabezados sin espacios alrededor y sin filas totalmente vacías: un
+    archivo valida igual y sus filas tienen la misma posición (claves de
+    idempotencia) sin importar qué lector se use.
+    """
+    df = pd.read_excel(origen, engine='openpyxl')
+    df.columns = [str(columna).strip() for columna in df.columns]
+    return df.dropna(how='all').reset_index(drop=True)
+
+class LectorExcel:
+    """Lectura en modo solo-lectura de openpyxl: fila a fila, sin cargar el libro completo"""
+
+    def __init__(self, archivo):
+        self.archivo = archivo
+
+    def _filas(self) -> Iterator[tuple]:
+        # openpyxl solo se carga cuando realmente se lee un archivo
+        from openpyxl import load_workbook
+        
+        self.archivo.seek(0)
+        libro = load_workbook(self.archivo, read_only=True, data_only=True)
+        try:
+            yield from libro.active.iter_rows(values_only=True)
+        finally:
+            libro.close()
+
+    def encabezado(self) -> List[str]:
+        filas = self._filas()
+        try:
+            primera = next(filas, ())
+        finally:
+            filas.close()
+        return [str(valor).strip() if valor is not None else "" for valor in primera]
+
+    def iter_lotes(self, tamano_lote: int = TAMANO_LOTE_EXCEL) -> Iterator[pd.DataFrame]:
+        """DataFrames de `tamano_lote` filas con el encabezado como columnas"""
+        filas = self._filas()
+        try:
+            columnas = [str(v).strip() if v is not None else "" for v in next(filas, ())]
+            while True:
+                lote = [fila for fila in islice(filas, tamano_lote) if any(v is not None for v in fila)]
+                if not lote:
+                    return
+                yield pd.DataFrame.from_records(lote, columns=columnas)
+        finally:
+            filas.close()
+
+class CacheExcel:
+    """Excel subidos, parseados una sola vez e indexados por el hash de su contenido.
+
+    Se guarda en el estado de la sesión: la vista previa, la validación y la
+    inserción comparten el mismo DataFrame y todo desaparece al cerrar la sesión.
+    Los archivos grandes no se cargan enteros: solo se guardan su encabezado y
+    sus primeras filas, y los datos se leen en streaming al registrar.
+    """
+
+    CLAVE_ESTADO = "excel_parseados"
+
+    def __init__(self, estado: MutableMapping):
+        self.estado = estado
+
+    @property
+    def _archivos(self) -> dict:
+        if self.CLAVE_ESTADO not in self.estado:
+            self.estado[self.CLAVE_ESTADO] = {}
+        return self.estado[self.CLAVE_ESTADO]
+
+    @staticmethod
+    def huella(archivo) -> str:
+        """sha256 del contenido del archivo subido"""
+        return hashlib.sha256(archivo.getvalue()).hexdigest()
+
+    @staticmethod
+    def es_grande(archivo) -> bool:
+        return len(archivo.getvalue()) > UMBRAL_STREAMING
+
+    def _entrada(self, archivo) -> dict:
+        clave = self.huella(archivo)
+        archivos = self._archivos
+        if clave not in archivos:
+            if self.es_grande(archivo):
+                lector = LectorExcel(archivo)
+                primeras = next(lector.iter_lotes(tamano_lote=3), None)
+                archivos[clave] = {
+                    "columnas": lector.encabezado(),
+                    "vista_previa": primeras if primeras is not None else pd.DataFrame(),
+                    "df": None
+                }
+            else:
+                archivo.seek(0)
+                df = leer_excel(archivo)
+                archivos[clave] = {"columnas": list(df.columns), "vista_previa": df.head(3), "df": df}
+            # Los archivos reemplazados en el uploader salen primero
+            while len(archivos) > MAX_ARCHIVOS:
+                archivos.pop(next(iter(archivos)))
+        return archivos[clave]
+
+    def columnas(self, archivo) -> List[str]:
+        return self._entrada(archivo)["columnas"]
+
+    def vista_previa(self, archivo) -> pd.DataFrame:
+        return self._entrada(archivo)["vista_previa"]
+
+    def iter_lotes(self, archivo, tamano_lote: int = TAMANO_LOTE_EXCEL) -> Iterator[pd.DataFrame]:
+        """Datos del archivo por lotes: del DataFrame cacheado o en streaming si es grande"""
+        df = self._entrada(archivo)["df"]
+        if df is None:
+            yield from LectorExcel(archivo).iter_lotes(tamano_lote)
+            return
+        for inicio in range(0, len(df), tamano_lote):
+            yield df.iloc[inicio:inicio + tamano_lote]
+
+    def descartar(self, archivo):
+        self._archivos.pop(self.huella(archivo), None)
@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+from modules.async_db import leer_paginado
+from modules.migraciones import RESUMENES
+from modules.tipos import construir_frame
+
+class AnalisisLogic:
+    # Ventanas (en días) de las tendencias móviles
+    VENTANAS = (7, 28)
+
+    def __init__(self, db):
+        self.db = db
+
+    def _resumenes(self, fecha_inicio, fecha_fin):
+        """Resúmenes diarios de ventas, compras y gastos, pedidos en paralelo"""
+        filtros = {'fecha_inicio': fecha_inicio, 'fecha_fin': fecha_fin}
+        resumenes, faltantes = {}, {}
+        for tabla in RESUMENES:
+            clave = self.db.cache.clave(f"resumen_diario_{tabla}", filtros)
+            df = self.db.cache.obtener(clave)
+            if df is None:
+                faltantes[tabla] = clave
+            else:
+                resumenes[tabla] = df
+
+        def consulta(tabla):
+            claves, medidas = RESUMENES[tabla]
+
+            def construir(cliente):
+                query = (
+                    cliente.table(f"resumen_diario_{tabla}")
+                    .select(",".join([*claves, *medidas, 'registros']))
+                    .gt('registros', 0)
+                    .gte('fecha', fecha_inicio)
+                    .lte('fecha', fecha_fin)
+                )
+                for columna in claves:
+                    query = query.order(columna)
+                return query
+
+            return lambda cliente: leer_paginado(lambda: construir(cliente))
+
+        if faltantes:
+            filas = self.db.concurrente.reunir({tabla: consulta(tabla) for tabla in faltantes})
+            for tabla, clave in faltantes.items():
+                claves, medidas = RESUMENES[tabla]
+                df = construir_frame(filas[tabla], f"resumen_diario_{tabla}", [*claves, *medidas, 'registros'])
+                # Se guarda bajo la tabla original: sus escrituras invalidan la entrada
+                self.db.cache.guardar(clave, tabla, filtros, df)
+                resumenes[tabla] = df
+        return resumenes
+
+    @staticmethod
+    def _por_dia(df, valores, dias, columnas=None):
+        """Suma diaria de `valores` (por `columnas` si se indica) con todos los días del rango"""
+        if columnas is None:
+            return df.groupby('fecha', observed=True)[valores].sum().reindex(dias, fill_value=0)
+        return (
+            df.pivot_table(index='fecha', columns=columnas, values=valores, aggfunc='sum', observed=True)
+            .reindex(dias)
+            .fillna(0)
+        )
+
+    @staticmethod
+    def _dividir(numerador, denominador):
+        """Cociente con NaN donde el denominador es cero"""
+        if isinstance(denominador, pd.Series):
+            return numerador / denominador.where(denominador != 0)
+        return numerador / denominador if denominador else np.nan
+
+    def calcular(self, fecha_inicio, fecha_fin):
+        """KPIs del negocio entre dos fechas (date), vectorizados sobre los resúmenes diarios.
+
+        Devuelve un dict con `diario` (serie por día con medias móviles),
+        `por_entidad`, `por_grupo` y `kpis` (totales del periodo).
+        """
+        try:
+            # Días previos para que las ventanas móviles estén completas desde el inicio
+            desde = fecha_inicio - timedelta(days=max(self.VENTANAS) - 1)
+            resumenes = self._resumenes(desde.isoformat(), fecha_fin.isoformat())
+            dias = pd.date_range(desde, fecha_fin, freq='D', name='fecha')
+            ventas = resumenes['ventas']
+
+            por_cliente = self._por_dia(ventas, 'venta', dias, 'cliente').reindex(
+                columns=['clientes', 'cuenta_casa'], fill_value=0
+            )
+            diario = pd.DataFrame({
+                'ingresos': por_cliente['clientes'],
+                'cuenta_casa': por_cliente['cuenta_casa'],
+                'compras': self._por_dia(resumenes['compras'], 'monto', dias),
+                'gastos': self._por_dia(resumenes['gastos'], 'monto', dias)
+            }, index=dias)
+            diario['margen_operativo'] = diario['ingresos'] - diario['compras'] - diario['gastos']
+            diario['food_cost_pct'] = self._dividir(diario['compras'], diario['ingresos'])
+            diario['margen_pct'] = self._dividir(diario['margen_operativo'], diario['ingresos'])
+
+            # Las compras son irregulares: los porcentajes móviles se calculan sobre sumas móviles
+            for ventana in self.VENTANAS:
+                sumas = diario[['ingresos', 'compras', 'margen_operativo']].rolling(ventana, min_periods=1).sum()
+                diario[f'ingresos_media_{ventana}d'] = sumas['ingresos'] / ventana
+                diario[f'food_cost_pct_{ventana}d'] = self._dividir(sumas['compras'], sumas['ingresos'])
+                diario[f'margen_pct_{ventana}d'] = self._dividir(sumas['margen_operativo'], sumas['ingresos'])
+
+            inicio = pd.Timestamp(fecha_inicio)
+            diario = diario.loc[inicio:]
+            ventas = ventas[ventas['fecha'] >= inicio]
+            clientes = ventas[ventas['cliente'] == 'clientes']
+
+            por_entidad = self._por_dia(clientes, 'venta', dias, 'entidad').loc[inicio:]
+            por_grupo = (
+                clientes.groupby('grupo', observed=True)[['venta', 'cantidad']].sum()
+                .sort_values('venta', ascending=False)
+                .reset_index()
+            )
+
+            totales = diario[['ingresos', 'cuenta_casa', 'compras', 'gastos', 'margen_operativo']].sum()
+            ultimo = diario.iloc[-1] if not diario.empty else None
+            kpis = {
+                'ingresos': totales['ingresos'],
+                'compras': totales['compras'],
+                'gastos': totales['gastos'],
+                'margen_operativo': totales['margen_operativo'],
+                'margen_pct': self._dividir(totales['margen_operativo'], totales['ingresos']),
+                'food_cost_pct': self._dividir(totales['compras'], totales['ingresos']),
+                'participacion_cuenta_casa': self._dividir(
+                    totales['cuenta_casa'], totales['ingresos'] + totales['cuenta_casa']
+                ),
+                'ingresos_promedio_diario': diario['ingresos'].mean() if not diario.empty else np.nan,
+                # Media de la última semana frente a la de las últimas cuatro
+                'tendencia_7_28': (
+                    self._dividir(ultimo['ingresos_media_7d'], ultimo['ingresos_media_28d']) - 1
+                    if ultimo is not None else np.nan
+                )
+            }
+            return {'diario': diario, 'por_entidad': por_entidad, 'por_grupo': por_grupo, 'kpis': kpis}
+
+        except Exception as e:
+            raise ValueError(f"Error en análisis: {str(e)}")
@@ -3,6 +3,10 @@ import streamlit as st
 class ComprasGastosLogic:
     def __init__(self, db):
         self.db = db
+    
+    def opciones(self, tipo, base=()):
+        """Opciones de un desplegable: las fijas más las conocidas en el catálogo"""
+        return self.db.catalogo.opciones(tipo, base)
         
     def process_registro(self, categoria, fecha, producto, monto, 
                        proveedor, cantidad, unidad, descripcion):
@@ -47,9 +51,18 @@ class ComprasGastosLogic:
                 base_data.pop('cantidad', None)
                 base_data.pop('unidad_medida', None)
 
-            self.db.client.table(table).insert(base_data).execute()
-            st.success("✅ Registro guardado correctamente!")
-            st.rerun()
+            if self.db.cola is not None:
+                # Se confirma al instante; el envío a Supabase ocurre en segundo plano
+                self.db.cola.encolar(table, base_data)
+            else:
+                self.db.client.table(table).insert(base_data).execute()
+                self.db.cache.invalidar(table, [base_data["fecha"]])
+            # Un producto o proveedor nuevo aparece en los desplegables al recargar
+            self.db.catalogo.invalidar()
+            # El toast sobrevive al rerun (un st.success se perdería al redibujar)
+            st.toast("✅ Registro guardado correctamente!", icon="✅")
+            # El formulario es un fragmento: solo él se vuelve a dibujar
+            st.rerun(scope="fragment")
             
         except Exception as e:
             st.error(f"**Errores detectados:**\n{str(e)}")
\ No newline at end of file
@@ -1,42 +1,165 @@
-import pandas as pd
 from datetime import datetime
+from modules.catalogo import CATEGORIAS_BASE
+from modules.database import LIMITE_BUSQUEDA
+from modules.tipos import construir_frame
 
 class ConsultasLogic:
+    # Columnas que realmente muestran las vistas de consulta
+    COLUMNAS = {
+        "compras": ["fecha", "producto", "monto", "categoria", "cantidad", "unidad_medida"],
+        "gastos": ["fecha", "producto", "monto", "categoria", "descripcion"]
+    }
+    
     def __init__(self, db):
         self.db = db
+    
+    def categorias(self):
+        """Categorías para el filtro: las fijas más las que aparecen en el catálogo"""
+        return self.db.catalogo.opciones('categoria', CATEGORIAS_BASE)
         
-    def obtener_datos_consulta(self, tabla, filtros):
-        """Obtiene datos filtrados para consultas"""
-        try:
-            query = self.db.client.table(tabla).select("*")
-            
-            # Aplicar filtros
+    def _construir_filtros(self, tabla, filtros):
+        """Devuelve una función que aplica los filtros de fecha y categoría a una query.
+
+        La búsqueda por texto no se aplica aquí: va por `db.buscar` (índice de trigramas).
+        """
+        def aplicar(query):
             if 'fecha_inicio' in filtros and 'fecha_fin' in filtros:
                 query = query.gte('fecha', filtros['fecha_inicio'])
                 query = query.lte('fecha', filtros['fecha_fin'])
             
             if 'categoria' in filtros:
                 query = query.ilike('categoria', f"%{filtros['categoria']}%")
+            return query
+        
+        return aplicar
+    
+    def _consultar(self, tabla, filtros, columnas, limite_busqueda=LIMITE_BUSQUEDA):
+        """Filas que coinciden con la búsqueda por texto de `filtros` (y sus fechas y categoría)"""
+        try:
+            if self.db.replica is not None:
+                # Réplica local: SQL sobre SQLite tras traer solo las filas nuevas
+                return self.db.replica.consultar(
+                    tabla, filtros, columnas or self.COLUMNAS[tabla], limite_busqueda
+                ).reset_index(drop=True)
             
-            if 'busqueda' in filtros and filtros['busqueda']:
-                if tabla == 'gastos':
-                    query = query.or_(f"producto.ilike.%{filtros['busqueda']}%,descripcion.ilike.%{filtros['busqueda']}%")
-                else:
-                    query = query.ilike('producto', f"%{filtros['busqueda']}%")
+            # Resultados ordenados por relevancia (con límite salvo limite_busqueda=None)
+            df = construir_frame(self.db.buscar(
+                tabla,
+                filtros['busqueda'],
+                fecha_inicio=filtros.get('fecha_inicio'),
+                fecha_fin=filtros.get('fecha_fin'),
+                categoria=filtros.get('categoria'),
+                columns=columnas,
+                limite=limite_busqueda
+            ), tabla)
+            if df.empty:
+                return construir_frame([], tabla, columnas or self.COLUMNAS[tabla])
             
-            result = query.execute()
-            return pd.DataFrame(result.data)
+            # `id` (paginación) y las columnas de la búsqueda local no se devuelven
+            if columnas:
+                df = df[list(columnas)]
+            return df
+            
+        except Exception as e:
+            raise ValueError(f"Error en consulta: {str(e)}")
+    
+    def obtener_pagina(self, tabla, filtros, pagina, tamano, orden='fecha', descendente=True):
+        """(DataFrame de la página `pagina` (desde 1), total de filas) con orden del servidor"""
+        columnas = self.COLUMNAS[tabla]
+        if orden not in columnas:
+            raise ValueError(f"Columna de orden no válida: {orden}")
+        
+        clave = self.db.cache.clave(tabla, {**filtros, 'pagina': (pagina, tamano, orden, descendente)}, columnas)
+        resultado = self.db.cache.obtener(clave)
+        if resultado is None:
+            resultado = self._pagina(tabla, filtros, columnas, (pagina - 1) * tamano, tamano, orden, descendente)
+            self.db.cache.guardar(clave, tabla, filtros, resultado)
+        df, total = resultado
+        return df.copy(), total
+    
+    def _pagina(self, tabla, filtros, columnas, inicio, tamano, orden, descendente):
+        try:
+            if filtros.get('busqueda'):
+                # Sin LIMITE_BUSQUEDA: el total debe coincidir con el del agregado (métricas y gráfico)
+                if self.db.replica is not None:
+                    df = self._consultar(tabla, filtros, columnas, limite_busqueda=None)
+                    df = df.sort_values(orden, ascending=not descendente, kind='stable')
+                    return df.iloc[inicio:inicio + tamano].reset_index(drop=True), len(df)
+                
+                filas, total = self.db.buscar_pagina(
+                    tabla,
+                    filtros['busqueda'],
+                    fecha_inicio=filtros.get('fecha_inicio'),
+                    fecha_fin=filtros.get('fecha_fin'),
+                    categoria=filtros.get('categoria'),
+                    columns=columnas,
+                    orden=orden,
+                    descendente=descendente,
+                    inicio=inicio,
+                    tamano=tamano
+                )
+                return construir_frame(filas, tabla, columnas), total
+            
+            if self.db.replica is not None:
+                return self.db.replica.pagina(tabla, filtros, columnas, orden, descendente, inicio, tamano)
+            
+            filas, total = self.db.get_pagina(
+                tabla,
+                columnas,
+                aplicar_filtros=self._construir_filtros(tabla, filtros),
+                orden=orden,
+                descendente=descendente,
+                inicio=inicio,
+                tamano=tamano
+            )
+            return construir_frame(filas, tabla, columnas), total
+            
+        except Exception as e:
+            raise ValueError(f"Error en consulta: {str(e)}")
+    
+    def obtener_agregado(self, tabla, filtros, agrupar=('fecha',)):
+        """Montos agregados por `agrupar`, calculados en Postgres cuando es posible"""
+        clave = self.db.cache.clave(tabla, {**filtros, 'agregado': tuple(agrupar)})
+        df = self.db.cache.obtener(clave)
+        if df is None:
+            df = self._agregar(tabla, filtros, list(agrupar))
+            self.db.cache.guardar(clave, tabla, filtros, df)
+        return df.copy()
+    
+    def _agregar(self, tabla, filtros, agrupar):
+        try:
+            if filtros.get('busqueda'):
+                # La búsqueda por producto no está en el resumen: se agregan todas las coincidencias
+                df = self._consultar(tabla, filtros, ['fecha', 'categoria', 'monto'], limite_busqueda=None)
+                df['registros'] = 1
+            elif self.db.replica is not None:
+                return self.db.replica.agregar(tabla, filtros, agrupar)
+            else:
+                filtros_vista = {k: v for k, v in filtros.items() if k != 'busqueda'}
+                df = construir_frame(self.db.get_resumen(
+                    tabla,
+                    aplicar_filtros=self._construir_filtros(tabla, filtros_vista)
+                ), f"resumen_diario_{tabla}")
+            
+            if df.empty:
+                return construir_frame([], tabla, [*agrupar, 'monto', 'registros'])
+            
+            # observed=True: solo los grupos presentes, no el producto de todas las categorías
+            return df.groupby(agrupar, as_index=False, observed=True)[['monto', 'registros']].sum()
             
         except Exception as e:
             raise ValueError(f"Error en consulta: {str(e)}")
     
     def generar_metricas(self, df):
-        """Calcula métricas básicas para los datos"""
+        """Calcula métricas básicas a partir del agregado por fecha y categoría"""
         if df.empty:
             return {}
-            
+        
+        por_dia = df.groupby('fecha', observed=True)['monto'].sum()
+        por_categoria = df.groupby('categoria', observed=True)['registros'].sum()
         return {
             'total': df['monto'].sum(),
-            'promedio_diario': df.groupby('fecha')['monto'].sum().mean(),
-            'categoria_mas_comun': df['categoria'].mode()[0] if not df['categoria'].mode().empty else 'N/A'
-        }
\ No newline at end of file
+            'promedio_diario': por_dia.mean(),
+            'dia_mayor_movimiento': por_dia.idxmax(),
+            'categoria_mas_comun': por_categoria.idxmax() if not por_categoria.empty else 'N/A'
+        }
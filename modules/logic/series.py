@@ -0,0 +1,99 @@
+"""Preparación de series temporales para gráficos.
+
+Elige la granularidad (día, semana o mes) según la amplitud del rango y,
+si aun así quedan más puntos que `PUNTOS_MAXIMOS`, reduce la serie con
+Largest-Triangle-Three-Buckets: se conservan los puntos que mejor preservan
+la forma visual. El tamaño de lo que se envía al navegador queda acotado
+sin importar cuánta historia abarque la consulta.
+"""
+import numpy as np
+import pandas as pd
+
+# Puntos por serie que se envían como máximo a Plotly
+PUNTOS_MAXIMOS = 500
+
+# Rangos (en días) hasta los que se usa cada granularidad; por encima, mensual
+GRANULARIDADES = [
+    (92, 'D', 'día'),
+    (731, 'W-MON', 'semana'),
+]
+MENSUAL = ('MS', 'mes')
+
+def granularidad(inicio, fin):
+    """(frecuencia de pandas, nombre) adecuada para un rango de fechas"""
+    dias = (pd.Timestamp(fin) - pd.Timestamp(inicio)).days
+    for limite, frecuencia, nombre in GRANULARIDADES:
+        if dias <= limite:
+            return frecuencia, nombre
+    return MENSUAL
+
+def lttb(x, y, umbral):
+    """Índices de los `umbral` puntos elegidos por Largest-Triangle-Three-Buckets"""
+    n = len(y)
+    if umbral >= n or umbral < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    indices = np.empty(umbral, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    # umbral - 2 cubetas entre el primer y el último punto (que siempre se conservan)
+    limites = np.linspace(1, n - 1, umbral - 1).astype(int)
+    anterior = 0
+    for i in range(umbral - 2):
+        inicio, fin = limites[i], limites[i + 1]
+        siguiente_fin = limites[i + 2] if i + 2 < len(limites) else n
+        promedio_x = x[fin:siguiente_fin].mean()
+        promedio_y = y[fin:siguiente_fin].mean()
+        # Área del triángulo (punto elegido antes, candidato, promedio de la cubeta siguiente)
+        areas = np.abs(
+            (x[anterior] - promedio_x) * (y[inicio:fin] - y[anterior])
+            - (x[anterior] - x[inicio:fin]) * (promedio_y - y[anterior])
+        )
+        anterior = inicio + int(np.argmax(areas))
+        indices[i + 1] = anterior
+    return indices
+
+def preparar_serie(
+    df, x, columnas, frecuencia=None, agregacion='sum', puntos_maximos=PUNTOS_MAXIMOS, sin_agregar=()
+):
+    """Serie compacta para graficar `columnas` contra la fecha `x`.
+
+    Sin `frecuencia` se elige por el rango de fechas ('D' deja un punto por día).
+    Los periodos sin datos quedan en NaN (huecos en el gráfico), no en 0.
+    Las columnas de `sin_agregar` (ratios ya calculados, p. ej. porcentajes
+    móviles) no se suman: se toma su valor al cierre de cada periodo.
+    Si la reducción LTTB es necesaria, los puntos se eligen con la primera
+    columna y se aplican a todas para que compartan eje.
+    Devuelve (DataFrame, nombre de la granularidad).
+    """
+    columnas = list(columnas)
+    if df.empty:
+        return df[[x, *columnas]], 'día'
+
+    df = df[[x, *columnas]].copy()
+    df[x] = pd.to_datetime(df[x])
+    if frecuencia is None:
+        frecuencia, nombre = granularidad(df[x].min(), df[x].max())
+    else:
+        nombre = next((n for _, f, n in GRANULARIDADES if f == frecuencia), MENSUAL[1])
+
+    agrupar = {'freq': frecuencia}
+    if frecuencia.startswith('W'):
+        # Semanas etiquetadas con su lunes
+        agrupar.update(label='left', closed='left')
+    grupos = df.groupby(pd.Grouper(key=x, **agrupar))
+    medidas = [c for c in columnas if c not in sin_agregar]
+    if agregacion == 'sum':
+        serie = grupos[medidas].sum(min_count=1)
+    else:
+        serie = grupos[medidas].agg(agregacion)
+    ratios = [c for c in columnas if c in sin_agregar]
+    if ratios:
+        serie = serie.join(grupos[ratios].last(skipna=False))
+    serie = serie[columnas].reset_index()
+
+    if len(serie) > puntos_maximos:
+        indices = lttb(serie[x].astype('int64'), serie[columnas[0]], puntos_maximos)
+        serie = serie.iloc[indices].reset_index(drop=True)
+    return serie, nombre
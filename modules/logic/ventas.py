@@ -1,46 +1,351 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import re
+import time
 import pandas as pd
 import streamlit as st
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from modules.carga_masiva import CargaMasiva, ErrorCarga, ResultadoCarga, es_reintentable
+from modules.cola_offline import CONFLICTO_IDEMPOTENCIA, clave_idempotencia
+from modules.excel import CacheExcel, leer_excel
+
+ENTIDADES = ["restaurante", "domicilio"]
+COLUMNAS_EXCEL = ["Grupo", "Nombre", "Cantidad", "$ Venta"]
+
+# Formatos de fecha reconocidos en el nombre de archivo
+_PATRONES_FECHA = [
+    (re.compile(r"(\d{4})[-_.]?(\d{2})[-_.]?(\d{2})"), ("anio", "mes", "dia")),
+    (re.compile(r"(\d{2})[-_.](\d{2})[-_.](\d{4})"), ("dia", "mes", "anio"))
+]
+
+def _parsear_archivo(contenido, entidad, fecha):
+    """Lee y transforma un Excel completo (se ejecuta en un proceso del pool)"""
+    df = leer_excel(io.BytesIO(contenido))
+    faltantes = [col for col in COLUMNAS_EXCEL if col not in df.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas: {', '.join(faltantes)}")
+    return VentasLogic._transformar_datos(df, entidad, fecha)
 
 class VentasLogic:
     def __init__(self, db):
         self.db = db
+        self.cargador = CargaMasiva(db)
+        self.excel = CacheExcel(st.session_state)
+        
+    def vista_previa(self, archivo):
+        """Primeras filas del archivo subido (parseado una única vez por sesión)"""
+        return self.excel.vista_previa(archivo)
         
     def registrar_ventas(self, archivo, entidad, fecha):
         """Registra ventas para una entidad específica con validaciones"""
+        inicio = time.perf_counter()
         try:
             # Validar entidad permitida
-            if entidad not in ["restaurante", "domicilio"]:
+            if entidad not in ENTIDADES:
                 raise ValueError("Entidad no válida")
                 
-            # Verificar registro existente
-            if self._existe_registro(fecha, entidad):
-                raise ValueError(f"¡Ya existe registro para {entidad} en esta fecha!")
-            
-            # Leer y validar Excel
-            df = pd.read_excel(archivo, engine='openpyxl')
-            
-            # Validar estructura del archivo
-            columnas_requeridas = ["Grupo", "Nombre", "Cantidad", "$ Venta"]
-            if not all(col in df.columns for col in columnas_requeridas):
-                faltantes = [col for col in columnas_requeridas if col not in df.columns]
+            # Validar estructura del archivo (solo el encabezado)
+            columnas = self.excel.columnas(archivo)
+            columnas_requeridas = COLUMNAS_EXCEL
+            if not all(col in columnas for col in columnas_requeridas):
+                faltantes = [col for col in columnas_requeridas if col not in columnas]
                 raise ValueError(f"Faltan columnas: {', '.join(faltantes)}")
             
-            # Transformar datos
-            datos = self._transformar_datos(df, entidad, fecha)
+            # Una carga parcial del mismo archivo se reanuda; si no, se reserva el día
+            id_carga = f"{self.excel.huella(archivo)}:{entidad}:{fecha}"
+            if not self.cargador.en_progreso(id_carga):
+                try:
+                    if self.db.dias_ventas.reservar(fecha, entidad):
+                        # Reserva abandonada por otra sesión: se descartan sus filas parciales
+                        self._eliminar_registro(fecha, entidad)
+                except Exception as e:
+                    if self.db.cola is None or not es_reintentable(e):
+                        raise
+                    # Sin conexión desde el inicio: la reserva se encola delante de las filas
+                    resultado = self._encolar_restante(
+                        self._filas_carga(archivo, entidad, fecha, id_carga), id_carga, inicio,
+                        reservas=[(fecha, entidad)]
+                    )
+                    self.excel.descartar(archivo)
+                    return resultado
             
-            # Insertar en base de datos
-            respuesta = self.db.client.table('ventas').insert(datos).execute()
+            # Transformar e insertar por lotes, sin materializar el archivo completo
+            try:
+                resultado = self.cargador.cargar(
+                    'ventas',
+                    self._filas_carga(archivo, entidad, fecha, id_carga),
+                    id_carga,
+                    conflicto=CONFLICTO_IDEMPOTENCIA
+                )
+            except ErrorCarga as e:
+                if es_reintentable(e.__cause__):
+                    if self.db.cola is not None:
+                        # Sin conexión: lo no enviado pasa a la cola local y el día se cierra al sincronizar
+                        resultado = self._encolar_restante(
+                            self._filas_carga(archivo, entidad, fecha, id_carga), id_carga, inicio
+                        )
+                        self.excel.descartar(archivo)
+                        return resultado
+                    # Con lotes confirmados el día queda reservado para reanudar
+                    if e.lotes_confirmados:
+                        raise
+                elif e.lotes_confirmados:
+                    # Reintentar no serviría (p. ej. un check violado): se deshace lo ya insertado
+                    self._eliminar_registro(fecha, entidad)
+                self.cargador.descartar(id_carga)
+                self.db.dias_ventas.liberar(fecha, entidad)
+                raise
+            except Exception:
+                # Datos inválidos a mitad del archivo: se deshace lo ya insertado
+                self._eliminar_registro(fecha, entidad)
+                self.cargador.descartar(id_carga)
+                self.db.dias_ventas.liberar(fecha, entidad)
+                raise
+            finally:
+                self.db.cache.invalidar('ventas', [fecha])
             
-            if not respuesta.data:
-                raise ValueError("No se insertaron registros")
+            if not resultado.filas_totales:
+                self.db.dias_ventas.liberar(fecha, entidad)
+                raise ValueError("El archivo no contiene registros")
             
-            return respuesta.data
+            # Al reanudar, `filas` solo cuenta este intento: el día guarda el total
+            self.db.dias_ventas.completar(fecha, entidad, resultado.filas_totales)
+            self.excel.descartar(archivo)
+            return resultado
             
         except Exception as e:
             raise ValueError(f"Error en {entidad}: {str(e)}") from e
     
-    def _transformar_datos(self, df, entidad, fecha):
+    def _filas_carga(self, archivo, entidad, fecha, id_carga):
+        """Filas transformadas del archivo, cada una con una clave de idempotencia estable"""
+        return self._con_claves(
+            (
+                registro
+                for lote in self.excel.iter_lotes(archivo)
+                for registro in self._transformar_datos(lote, entidad, fecha)
+            ),
+            id_carga
+        )
+    
+    @staticmethod
+    def _con_claves(filas, id_archivo):
+        """Añade a cada fila una clave de idempotencia (archivo, destino y posición)"""
+        for indice, registro in enumerate(filas):
+            registro['clave_idempotencia'] = clave_idempotencia(id_archivo, indice)
+            yield registro
+    
+    def _encolar_restante(self, filas, id_carga, inicio, reservas=()):
+        """Encola las filas de los lotes no confirmados y el cierre de cada día.
+
+        `reservas` son los días que no se pudieron reservar: su alta en el
+        libro de días se encola antes que las filas (si ya existe, se ignora).
+        El cierre de un día no se envía si la cola rechazó alguna de sus filas.
+        """
+        confirmados = self.cargador.lotes_confirmados(id_carga)
+        por_dia = Counter()
+        
+        def grupo(registro):
+            return f"{id_carga}:{registro['fecha']}:{registro['entidad']}"
+        
+        def sin_confirmar():
+            for indice, registro in enumerate(filas):
+                por_dia[(registro['fecha'], registro['entidad'])] += 1
+                if indice // self.cargador.tamano_lote not in confirmados:
+                    yield registro
+        
+        # Se leen antes de encolar nada: un archivo inválido no deja una reserva suelta
+        restantes = list(sin_confirmar())
+        self.db.cola.encolar_lote(
+            'ventas_dias',
+            [{'fecha': fecha, 'entidad': entidad, 'completo': False} for fecha, entidad in reservas],
+            conflicto='fecha,entidad',
+            grupo=grupo
+        )
+        en_cola = self.db.cola.encolar_lote('ventas', restantes, grupo=grupo)
+        self.db.cola.encolar_lote(
+            'ventas_dias',
+            [
+                {'fecha': fecha, 'entidad': entidad, 'filas': total, 'completo': True}
+                for (fecha, entidad), total in por_dia.items()
+            ],
+            conflicto='fecha,entidad',
+            fusionar=True,
+            grupo=grupo,
+            cierre=True
+        )
+        self.cargador.descartar(id_carga)
+        total = sum(por_dia.values())
+        return ResultadoCarga(
+            filas=total - en_cola,
+            lotes=len(confirmados),
+            lotes_omitidos=0,
+            segundos=time.perf_counter() - inicio,
+            filas_en_cola=en_cola
+        )
+    
+    @staticmethod
+    def inferir_destino(nombre_archivo):
+        """Deduce (fecha ISO, entidad) del nombre del archivo; None si no se reconoce"""
+        nombre = nombre_archivo.lower()
+        entidad = next((e for e in ENTIDADES if e in nombre), None)
+        
+        fecha = None
+        for patron, orden in _PATRONES_FECHA:
+            coincidencia = patron.search(nombre)
+            if coincidencia:
+                partes = dict(zip(orden, map(int, coincidencia.groups())))
+                try:
+                    fecha = datetime(partes["anio"], partes["mes"], partes["dia"]).date().isoformat()
+                    break
+                except ValueError:
+                    continue
+        
+        return fecha, entidad
+    
+    def registros_existentes(self, pares):
+        """Subconjunto de pares (fecha, entidad) que ya tienen ventas"""
+        return self.db.dias_ventas.existentes(pares)
+    
+    def dias_faltantes(self, inicio, fin):
+        """Calendario de días sin ventas registradas en el rango, por entidad"""
+        return self.db.dias_ventas.faltantes(inicio, fin)
+    
+    def registrar_lote(self, archivos):
+        """Importa varios archivos de una vez.
+
+        `archivos` es una lista de (archivo, fecha, entidad). Los archivos se
+        parsean en paralelo en procesos separados y todas las filas válidas se
+        cargan en una única carga masiva. Devuelve (resumen por archivo, ResultadoCarga).
+        """
+        inicio = time.perf_counter()
+        resumen = []
+        pendientes = []
+        vistos = set()
+        
+        for archivo, fecha, entidad in archivos:
+            fila = {'archivo': archivo.name, 'fecha': fecha, 'entidad': entidad, 'filas': 0, 'estado': ''}
+            resumen.append(fila)
+            if entidad not in ENTIDADES or not fecha:
+                fila['estado'] = "❌ Fecha o entidad sin asignar"
+            elif (fecha, entidad) in vistos:
+                fila['estado'] = "⏭️ Duplicado en el lote"
+            else:
+                vistos.add((fecha, entidad))
+                pendientes.append((fila, archivo.getvalue()))
+        
+        # Identificador de la carga: contenido y destino de cada archivo
+        huella = hashlib.sha256()
+        for fila, contenido in pendientes:
+            huella.update(f"{fila['fecha']}:{fila['entidad']}:".encode('utf-8'))
+            huella.update(hashlib.sha256(contenido).digest())
+        id_carga = huella.hexdigest()
+        reanudando = self.cargador.en_progreso(id_carga)
+        sin_conexion = False
+        
+        # Una sola comprobación contra el libro de días para todo el lote
+        if not reanudando:
+            try:
+                existentes = self.registros_existentes(vistos)
+            except Exception as e:
+                if self.db.cola is None or not es_reintentable(e):
+                    raise
+                # Sin conexión no se puede comprobar: las reservas irán a la cola con las filas
+                existentes, sin_conexion = set(), True
+            for fila, _ in pendientes:
+                if (fila['fecha'], fila['entidad']) in existentes:
+                    fila['estado'] = "⏭️ Ya registrado"
+            pendientes = [(fila, contenido) for fila, contenido in pendientes if not fila['estado']]
+        
+        # spawn: el servidor de Streamlit usa hilos y fork no es seguro
+        contexto = multiprocessing.get_context('spawn')
+        lotes = []
+        with ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=contexto) as pool:
+            futuros = [
+                (fila, contenido, pool.submit(_parsear_archivo, contenido, fila['entidad'], fila['fecha']))
+                for fila, contenido in pendientes
+            ]
+            for fila, contenido, futuro in futuros:
+                try:
+                    datos = futuro.result()
+                except Exception as e:
+                    fila['estado'] = f"❌ {str(e)}"
+                    continue
+                if not datos:
+                    fila['estado'] = "⚠️ Archivo sin registros"
+                    continue
+                
+                # Reservar el día (al reanudar ya está reservado)
+                if not reanudando and not sin_conexion:
+                    try:
+                        if self.db.dias_ventas.reservar(fila['fecha'], fila['entidad']):
+                            self._eliminar_registro(fila['fecha'], fila['entidad'])
+                    except ValueError:
+                        fila['estado'] = "⏭️ Ya registrado"
+                        continue
+                    except Exception as e:
+                        if self.db.cola is None or not es_reintentable(e):
+                            raise
+                        sin_conexion = True
+                
+                # Mismas claves que en el registro diario del mismo archivo
+                id_archivo = f"{hashlib.sha256(contenido).hexdigest()}:{fila['entidad']}:{fila['fecha']}"
+                fila['filas'] = len(datos)
+                lotes.append((fila, list(self._con_claves(datos, id_archivo))))
+        
+        if not lotes:
+            return pd.DataFrame(resumen), None
+        
+        dias = [(fila['fecha'], fila['entidad']) for fila, _ in lotes]
+        
+        def encolar(reservas=()):
+            # Sin conexión: lo no enviado pasa a la cola local y los días se cierran al sincronizar
+            resultado = self._encolar_restante(
+                (registro for _, datos in lotes for registro in datos), id_carga, inicio, reservas
+            )
+            for fila, _ in lotes:
+                fila['estado'] = "⏳ En cola"
+            return pd.DataFrame(resumen), resultado
+        
+        if sin_conexion:
+            # Los días ya reservados antes del corte ignoran su alta repetida
+            return encolar(reservas=dias)
+        
+        try:
+            resultado = self.cargador.cargar(
+                'ventas',
+                (registro for _, datos in lotes for registro in datos),
+                id_carga,
+                conflicto=CONFLICTO_IDEMPOTENCIA
+            )
+        except ErrorCarga as e:
+            if es_reintentable(e.__cause__):
+                if self.db.cola is not None:
+                    return encolar()
+                # Con lotes confirmados los días quedan reservados para reanudar
+                if e.lotes_confirmados:
+                    raise
+            elif e.lotes_confirmados:
+                # Reintentar no serviría: se deshace lo ya insertado
+                for fecha, entidad in dias:
+                    self._eliminar_registro(fecha, entidad)
+            self.cargador.descartar(id_carga)
+            for fecha, entidad in dias:
+                self.db.dias_ventas.liberar(fecha, entidad)
+            raise
+        finally:
+            self.db.cache.invalidar('ventas', sorted({fecha for fecha, _ in dias}))
+        
+        for fila, _ in lotes:
+            self.db.dias_ventas.completar(fila['fecha'], fila['entidad'], fila['filas'])
+            fila['estado'] = "✅ Registrado"
+        return pd.DataFrame(resumen), resultado
+    
+    @staticmethod
+    def _transformar_datos(df, entidad, fecha):
         """Transformación y validación de datos"""
         try:
             df = df.rename(columns={
@@ -70,11 +375,12 @@ class VentasLogic:
         except Exception as e:
             raise ValueError(f"Datos inválidos: {str(e)}") from e
     
-    def _existe_registro(self, fecha, entidad):
-        """Verifica registros existentes para la entidad y fecha"""
-        response = self.db.client.table('ventas').select("id").match({
+    def _eliminar_registro(self, fecha, entidad):
+        """Elimina las ventas de la entidad y fecha (compensa una carga fallida)"""
+        self.db.client.table('ventas').delete().match({
             'fecha': fecha,
             'entidad': entidad
         }).execute()
-        
-        return len(response.data) > 0
\ No newline at end of file
+        # Los borrados no avanzan la marca de agua de la réplica: se fuerza una relectura
+        if self.db.replica is not None:
+            self.db.replica.reconciliar('ventas')
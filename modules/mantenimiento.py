@@ -0,0 +1,85 @@
+"""Comandos de mantenimiento de la base de datos.
+
+Uso (desde la raíz del proyecto, con .streamlit/secrets.toml configurado):
+
+    python -m modules.mantenimiento migrar
+    python -m modules.mantenimiento reconstruir-resumenes
+    python -m modules.mantenimiento sincronizar-replica
+    python -m modules.mantenimiento sincronizar-cola
+    python -m modules.mantenimiento arranque [--presupuesto SEGUNDOS]
+
+`arranque` no necesita conexión: mide el tiempo de importación y termina
+con código 1 si se supera el presupuesto (pensado para CI).
+"""
+import argparse
+import sys
+
+from modules import arranque
+
+from modules.database import DatabaseManager
+from modules.migraciones import version_actual, version_esquema
+from modules.replica import ESQUEMA_REPLICA
+
+def reconstruir_resumenes(db):
+    """Recalcula los resúmenes diarios (backfill tras cargas o correcciones)"""
+    db.reconstruir_resumenes()
+    print("✅ Resúmenes diarios reconstruidos")
+
+def migrar(db):
+    """Muestra la versión del esquema (DatabaseManager ya aplica lo pendiente al crearse)"""
+    actual = version_actual(db.client)
+    if actual is None:
+        print("⚠️ No se pudo leer la versión del esquema. Revise los errores anteriores")
+    elif actual < version_esquema():
+        print(f"⚠️ Esquema en versión {actual}; se esperaba {version_esquema()}. Revise los errores anteriores")
+    else:
+        print(f"✅ Esquema en versión {actual}")
+
+def sincronizar_replica(db):
+    """Copia a la réplica local las filas nuevas de todas las tablas"""
+    if db.replica is None:
+        print("⚠️ Réplica local desactivada: configure REPLICA_LOCAL en secrets")
+        return
+    for tabla in ESQUEMA_REPLICA:
+        print(f"✅ {tabla}: {db.replica.sincronizar(tabla)} filas sincronizadas")
+
+def sincronizar_cola(db):
+    """Envía a Supabase los registros pendientes de la cola local"""
+    if db.cola is None:
+        print("⚠️ Cola local desactivada (COLA_REGISTROS vacío en secrets)")
+        return
+    print(f"✅ {db.cola.sincronizar()} registros enviados")
+    contadores = db.cola.contadores()
+    print(f"Pendientes: {contadores['pendiente']} · Con error: {contadores['error']}")
+
+COMANDOS = {
+    "migrar": migrar,
+    "reconstruir-resumenes": reconstruir_resumenes,
+    "sincronizar-replica": sincronizar_replica,
+    "sincronizar-cola": sincronizar_cola
+}
+
+def medir_arranque(presupuesto):
+    """Informe de tiempos de importación; False si se supera el presupuesto"""
+    correcto, lineas = arranque.informe(presupuesto)
+    print("\n".join(lineas))
+    if correcto:
+        print("✅ Arranque dentro del presupuesto")
+    return correcto
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mantenimiento de la base de datos")
+    parser.add_argument("comando", choices=sorted([*COMANDOS, "arranque"]))
+    parser.add_argument(
+        "--presupuesto", type=float, default=arranque.PRESUPUESTO_SEGUNDOS,
+        help="Segundos de importación permitidos al arrancar (comando arranque)"
+    )
+    args = parser.parse_args(argv)
+    
+    if args.comando == "arranque":
+        sys.exit(0 if medir_arranque(args.presupuesto) else 1)
+    
+    COMANDOS[args.comando](DatabaseManager())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+"""Migraciones versionadas del esquema de Supabase.
+
+Cada migración es una lista de sentencias SQL que se ejecutan con la RPC
+`execute_sql`. La tabla `schema_migraciones` guarda las versiones aplicadas,
+de modo que al arrancar solo se ejecuta lo pendiente. Para añadir un cambio
+de esquema se agrega una migración nueva al final de MIGRACIONES; las ya
+publicadas no se modifican.
+"""
+from typing import List, Optional, Tuple
+
+from postgrest.exceptions import APIError
+
+# Errores de Postgres/PostgREST cuando schema_migraciones aún no existe
+_TABLA_INEXISTENTE = ("42P01", "PGRST205")
+
+# Resúmenes diarios: tabla -> (columnas de agrupación, columnas sumadas)
+RESUMENES = {
+    "compras": (["fecha", "categoria"], ["monto"]),
+    "gastos": (["fecha", "categoria"], ["monto"]),
+    "ventas": (["fecha", "entidad", "grupo", "cliente"], ["cantidad", "venta"])
+}
+
+def _script_funcion_resumen(table: str, claves: List[str], medidas: List[str]) -> str:
+    """Función de los triggers que suma o resta las filas afectadas en resumen_diario_<table>"""
+    resumen = f"resumen_diario_{table}"
+    columnas_claves = ", ".join(claves)
+    
+    # ORDER BY: todas las transacciones bloquean las filas del resumen en el mismo
+    # orden, así los lotes concurrentes sobre las mismas claves esperan en vez de
+    # caer en deadlock (40P01)
+    def acumular(origen: str, signo: str) -> str:
+        sumas = ", ".join(f"{signo}SUM({m})" for m in medidas)
+        actualizar = ", ".join(
+            f"{c} = r.{c} + EXCLUDED.{c}" for c in [*medidas, "registros"]
+        )
+        return f"""
+            INSERT INTO {resumen} AS r ({columnas_claves}, {", ".join(medidas)}, registros)
+            SELECT {columnas_claves}, {sumas}, {signo}COUNT(*)
+            FROM {origen}
+            GROUP BY {columnas_claves}
+            ORDER BY {columnas_claves}
+            ON CONFLICT ({columnas_claves}) DO UPDATE SET {actualizar};
+        """
+    
+    return f"""
+            CREATE OR REPLACE FUNCTION acumular_{resumen}() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                    {acumular("filas_viejas", "-")}
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    {acumular("filas_nuevas", "")}
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """
+
+def _scripts_resumen(table: str, claves: List[str], medidas: List[str]) -> List[str]:
+    """SQL de la tabla resumen_diario_<table> y de los triggers que la mantienen"""
+    resumen = f"resumen_diario_{table}"
+    columnas_claves = ", ".join(claves)
+    
+    # Las columnas de agrupación se copian con el tipo de la tabla original
+    tipos_claves = {
+        "fecha": "DATE",
+        "categoria": "VARCHAR(50)",
+        "entidad": "VARCHAR(20)",
+        "grupo": "VARCHAR(50)",
+        "cliente": "VARCHAR(20)"
+    }
+    definicion = ",\n".join(
+        [f"{c} {tipos_claves[c]} NOT NULL" for c in claves]
+        + [f"{m} NUMERIC(14,3) NOT NULL DEFAULT 0" for m in medidas]
+        + ["registros BIGINT NOT NULL DEFAULT 0", f"PRIMARY KEY ({columnas_claves})"]
+    )
+    
+    scripts = [
+        f"CREATE TABLE IF NOT EXISTS {resumen} ({definicion})",
+        _script_funcion_resumen(table, claves, medidas)
+    ]
+    
+    # Postgres solo admite tablas de transición en triggers de un único evento
+    transiciones = {
+        "INSERT": "NEW TABLE AS filas_nuevas",
+        "DELETE": "OLD TABLE AS filas_viejas",
+        "UPDATE": "OLD TABLE AS filas_viejas NEW TABLE AS filas_nuevas"
+    }
+    for evento, referencia in transiciones.items():
+        trigger = f"trg_{resumen}_{evento.lower()}"
+        scripts.append(f"""
+            CREATE OR REPLACE TRIGGER {trigger}
+            AFTER {evento} ON {table}
+            REFERENCING {referencia}
+            FOR EACH STATEMENT EXECUTE FUNCTION acumular_{resumen}()
+        """)
+    
+    return scripts
+
+def _script_reconstruir_resumenes() -> str:
+    """Función SQL que vuelve a calcular todos los resúmenes desde cero"""
+    cuerpo = []
+    for table, (claves, medidas) in RESUMENES.items():
+        columnas_claves = ", ".join(claves)
+        cuerpo.append(f"""
+                LOCK TABLE {table} IN SHARE MODE;
+                DELETE FROM resumen_diario_{table};
+                INSERT INTO resumen_diario_{table} ({columnas_claves}, {", ".join(medidas)}, registros)
+                SELECT {columnas_claves}, {", ".join(f"SUM({m})" for m in medidas)}, COUNT(*)
+                FROM {table}
+                GROUP BY {columnas_claves};""")
+    
+    return f"""
+            CREATE OR REPLACE FUNCTION reconstruir_resumenes() RETURNS void AS $$
+            BEGIN{"".join(cuerpo)}
+            END;
+            $$ LANGUAGE plpgsql
+        """
+
+def _scripts_busqueda(table: str) -> List[str]:
+    """Función buscar_<table>: búsqueda por trigramas, sin acentos y ordenada por similitud"""
+    return [
+        f"""
+        CREATE INDEX IF NOT EXISTS idx_{table}_busqueda
+        ON {table} USING gin (documento_busqueda(producto, descripcion) extensions.gin_trgm_ops)
+        """,
+        f"""
+        CREATE OR REPLACE FUNCTION buscar_{table}(
+            termino TEXT,
+            fecha_inicio DATE DEFAULT NULL,
+            fecha_fin DATE DEFAULT NULL,
+            categoria TEXT DEFAULT NULL,
+            limite INTEGER DEFAULT NULL
+        ) RETURNS SETOF {table}
+        LANGUAGE sql STABLE
+        SET search_path = public, extensions
+        AS $$
+            SELECT t.*
+            FROM {table} t
+            WHERE (
+                    documento_busqueda(t.producto, t.descripcion) LIKE '%' || f_unaccent(lower(termino)) || '%'
+                    OR f_unaccent(lower(termino)) <% documento_busqueda(t.producto, t.descripcion)
+                )
+                AND (fecha_inicio IS NULL OR t.fecha >= fecha_inicio)
+                AND (fecha_fin IS NULL OR t.fecha <= fecha_fin)
+                AND (categoria IS NULL OR t.categoria ILIKE '%' || categoria || '%')
+            ORDER BY word_similarity(f_unaccent(lower(termino)), documento_busqueda(t.producto, t.descripcion)) DESC,
+                     t.fecha DESC
+            LIMIT limite
+        $$
+        """
+    ]
+
+# Valores de catálogo por tabla: tipo -> columna de origen
+CATALOGO = {
+    "compras": {"categoria": "categoria", "producto": "producto", "proveedor": "proveedor", "unidad": "unidad_medida"},
+    "gastos": {"categoria": "categoria", "producto": "producto", "proveedor": "proveedor"}
+}
+
+def _valores_catalogo(table: str, origen: str) -> str:
+    """SELECT de (tipo, valor, usos, ultimo_uso) con los valores no vacíos de `origen`"""
+    columnas = " UNION ALL ".join(
+        f"SELECT '{tipo}' AS tipo, btrim({columna}) AS valor, fecha FROM {origen}"
+        for tipo, columna in CATALOGO[table].items()
+    )
+    return f"""
+        SELECT tipo, valor, COUNT(*) AS usos, MAX(fecha) AS ultimo_uso
+        FROM ({columnas}) v
+        WHERE valor IS NOT NULL AND valor <> ''
+        GROUP BY tipo, valor"""
+
+def _scripts_catalogo(table: str) -> List[str]:
+    """Trigger que añade al catálogo los valores nuevos insertados en `table`"""
+    return [
+        f"""
+        CREATE OR REPLACE FUNCTION acumular_catalogo_{table}() RETURNS trigger AS $$
+        DECLARE
+            nuevos BIGINT;
+        BEGIN
+            WITH insertados AS (
+                INSERT INTO catalogo AS c (tipo, valor, usos, ultimo_uso)
+                {_valores_catalogo(table, "filas_nuevas")}
+                ON CONFLICT (tipo, valor) DO UPDATE SET
+                    usos = c.usos + EXCLUDED.usos,
+                    ultimo_uso = GREATEST(c.ultimo_uso, EXCLUDED.ultimo_uso)
+                RETURNING (xmax = 0) AS nuevo
+            )
+            SELECT COUNT(*) INTO nuevos FROM insertados WHERE nuevo;
+            -- Solo un valor nuevo cambia la versión (los contadores de uso no invalidan caches)
+            IF nuevos > 0 THEN
+                UPDATE catalogo_version SET version = version + 1;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        f"""
+        CREATE OR REPLACE TRIGGER trg_catalogo_{table}
+        AFTER INSERT ON {table}
+        REFERENCING NEW TABLE AS filas_nuevas
+        FOR EACH STATEMENT EXECUTE FUNCTION acumular_catalogo_{table}()
+        """
+    ]
+
+def _script_reconstruir_catalogo() -> str:
+    """Función SQL que vuelve a llenar el catálogo con los valores de las tablas originales"""
+    valores = " UNION ALL ".join(_valores_catalogo(table, table) for table in CATALOGO)
+    return f"""
+        CREATE OR REPLACE FUNCTION reconstruir_catalogo() RETURNS void AS $$
+        BEGIN
+            DELETE FROM catalogo;
+            INSERT INTO catalogo (tipo, valor, usos, ultimo_uso)
+            SELECT tipo, valor, SUM(usos), MAX(ultimo_uso)
+            FROM ({valores}) t
+            GROUP BY tipo, valor;
+            UPDATE catalogo_version SET version = version + 1;
+        END;
+        $$ LANGUAGE plpgsql
+    """
+
+# Tablas originales de la aplicación
+TABLAS_BASE = {
+    "compras": """
+        CREATE TABLE IF NOT EXISTS compras (
+            id SERIAL PRIMARY KEY,
+            fecha DATE NOT NULL,
+            categoria VARCHAR(50) NOT NULL DEFAULT 'Mercancía',
+            producto VARCHAR(100),
+            cantidad NUMERIC(10,3) NOT NULL DEFAULT 1,
+            unidad_medida VARCHAR(20) NOT NULL DEFAULT 'unidad',
+            monto NUMERIC(10,2) NOT NULL,
+            proveedor VARCHAR(100),
+            descripcion TEXT,
+            created_at TIMESTAMP DEFAULT NOW()
+        )
+    """,
+
+    "gastos": """
+        CREATE TABLE IF NOT EXISTS gastos (
+            id SERIAL PRIMARY KEY,
+            fecha DATE NOT NULL,
+            producto VARCHAR(100),
+            categoria VARCHAR(50) NOT NULL,
+            monto NUMERIC(10,2) NOT NULL,
+            descripcion TEXT,
+            proveedor VARCHAR(100),
+            created_at TIMESTAMP DEFAULT NOW()
+        )
+    """,
+
+    "ventas": """
+        CREATE TABLE IF NOT EXISTS ventas (
+            id SERIAL PRIMARY KEY,
+            fecha DATE NOT NULL,
+            grupo VARCHAR(50) NOT NULL,
+            nombre VARCHAR(100) NOT NULL,
+            cantidad INTEGER NOT NULL,
+            venta NUMERIC(10,2) NOT NULL,
+            entidad VARCHAR(20) NOT NULL CHECK (entidad IN ('restaurante', 'domicilio')),
+            cliente VARCHAR(20) NOT NULL CHECK (cliente IN ('clientes', 'cuenta_casa')),
+            created_at TIMESTAMP DEFAULT NOW()
+        )
+    """
+}
+
+# Versiones 1 y 2 recogen el esquema que antes se creaba en cada arranque
+MIGRACIONES: List[Tuple[int, str, List[str]]] = [
+    (1, "Tablas base", list(TABLAS_BASE.values())),
+    
+    (2, "Libro de días de ventas", [
+        """
+        CREATE TABLE IF NOT EXISTS ventas_dias (
+            fecha DATE NOT NULL,
+            entidad VARCHAR(20) NOT NULL CHECK (entidad IN ('restaurante', 'domicilio')),
+            filas INTEGER NOT NULL DEFAULT 0,
+            completo BOOLEAN NOT NULL DEFAULT FALSE,
+            reservado_en TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (fecha, entidad)
+        )
+        """,
+        # Días importados antes de existir el libro de días
+        """
+        INSERT INTO ventas_dias (fecha, entidad, filas, completo)
+        SELECT fecha, entidad, COUNT(*), TRUE
+        FROM ventas
+        GROUP BY fecha, entidad
+        ON CONFLICT (fecha, entidad) DO NOTHING
+        """
+    ]),
+    
+    (3, "Resúmenes diarios", [
+        *[
+            script
+            for table, (claves, medidas) in RESUMENES.items()
+            for script in _scripts_resumen(table, claves, medidas)
+        ],
+        _script_reconstruir_resumenes(),
+        "DROP VIEW IF EXISTS resumen_compras, resumen_gastos, resumen_ventas",
+        # Backfill inicial de los resúmenes con el histórico existente
+        "SELECT reconstruir_resumenes()"
+    ]),
+    
+    (4, "Índices para filtros por fecha, entidad y categoría", [
+        "CREATE INDEX IF NOT EXISTS idx_compras_fecha ON compras (fecha)",
+        "CREATE INDEX IF NOT EXISTS idx_gastos_fecha ON gastos (fecha)",
+        "CREATE INDEX IF NOT EXISTS idx_ventas_fecha ON ventas (fecha)",
+        "CREATE INDEX IF NOT EXISTS idx_ventas_fecha_entidad ON ventas (fecha, entidad)",
+        "CREATE INDEX IF NOT EXISTS idx_compras_categoria_fecha ON compras (categoria, fecha)",
+        "CREATE INDEX IF NOT EXISTS idx_gastos_categoria_fecha ON gastos (categoria, fecha)"
+    ]),
+    
+    (5, "Búsqueda por trigramas en producto y descripción", [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA extensions",
+        "CREATE EXTENSION IF NOT EXISTS unaccent WITH SCHEMA extensions",
+        # unaccent no es IMMUTABLE: el envoltorio permite usarlo en índices
+        """
+        CREATE OR REPLACE FUNCTION f_unaccent(TEXT) RETURNS TEXT
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT extensions.unaccent('extensions.unaccent', $1) $$
+        """,
+        """
+        CREATE OR REPLACE FUNCTION documento_busqueda(producto TEXT, descripcion TEXT) RETURNS TEXT
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE
+        AS $$ SELECT f_unaccent(lower(coalesce(producto, '') || ' ' || coalesce(descripcion, ''))) $$
+        """,
+        *_scripts_busqueda("compras"),
+        *_scripts_busqueda("gastos")
+    ]),
+    
+    (6, "Claves de idempotencia para registros enviados desde la cola local", [
+        script
+        for table in ("compras", "gastos", "ventas")
+        for script in (
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS clave_idempotencia UUID",
+            # Índice único (admite varios NULL) usado como destino de ON CONFLICT
+            f"CREATE UNIQUE INDEX IF NOT EXISTS uq_{table}_clave_idempotencia ON {table} (clave_idempotencia)"
+        )
+    ]),
+    
+    (7, "Catálogo de categorías, productos, proveedores y unidades", [
+        """
+        CREATE TABLE IF NOT EXISTS catalogo (
+            tipo VARCHAR(20) NOT NULL CHECK (tipo IN ('categoria', 'producto', 'proveedor', 'unidad')),
+            valor VARCHAR(100) NOT NULL,
+            usos BIGINT NOT NULL DEFAULT 0,
+            ultimo_uso DATE,
+            PRIMARY KEY (tipo, valor)
+        )
+        """,
+        # Una sola fila: la versión cambia cuando aparece un valor nuevo
+        """
+        CREATE TABLE IF NOT EXISTS catalogo_version (
+            id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+            version BIGINT NOT NULL DEFAULT 0
+        )
+        """,
+        "INSERT INTO catalogo_version (id, version) VALUES (TRUE, 0) ON CONFLICT (id) DO NOTHING",
+        *[script for table in CATALOGO for script in _scripts_catalogo(table)],
+        _script_reconstruir_catalogo(),
+        # Backfill con el histórico existente
+        "SELECT reconstruir_catalogo()"
+    ]),
+    
+    # Las bases creadas antes de añadir ORDER BY a la función de los triggers
+    (8, "Orden estable de bloqueos en los triggers de resúmenes", [
+        _script_funcion_resumen(table, claves, medidas)
+        for table, (claves, medidas) in RESUMENES.items()
+    ])
+]
+
+def version_esquema() -> int:
+    """Versión que tendrá el esquema tras aplicar todas las migraciones"""
+    return MIGRACIONES[-1][0]
+
+def _ejecutar(client, script: str):
+    client.rpc('execute_sql', params={'query': script}).execute()
+
+def version_actual(client) -> Optional[int]:
+    """Última versión aplicada (0 si la tabla de versiones no existe todavía).
+
+    Devuelve None si no se pudo leer por otro motivo (timeout, permisos,
+    cache de esquema desactualizada): no se sabe qué falta aplicar.
+    """
+    try:
+        filas = (
+            client.table('schema_migraciones')
+            .select('version')
+            .order('version', desc=True)
+            .limit(1)
+            .execute()
+            .data
+        )
+    except Exception as e:
+        if isinstance(e, APIError) and e.code in _TABLA_INEXISTENTE:
+            return 0
+        print(f"Error leyendo la versión del esquema: {str(e)}")
+        return None
+    return filas[0]['version'] if filas else 0
+
+def aplicar_migraciones(client) -> Optional[int]:
+    """Aplica en orden las migraciones pendientes y devuelve la versión resultante"""
+    actual = version_actual(client)
+    if actual is None:
+        # Sin versión fiable no se migra: repetir todo reconstruiría resúmenes y catálogo
+        return None
+    pendientes = [m for m in MIGRACIONES if m[0] > actual]
+    if not pendientes:
+        return actual
+    
+    try:
+        _ejecutar(client, """
+            CREATE TABLE IF NOT EXISTS schema_migraciones (
+                version INTEGER PRIMARY KEY,
+                descripcion TEXT NOT NULL,
+                aplicada_en TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+        """)
+    except Exception as e:
+        print(f"Error creando schema_migraciones: {str(e)}")
+        return actual
+    
+    for version, descripcion, scripts in pendientes:
+        try:
+            for script in scripts:
+                _ejecutar(client, script)
+            descripcion_sql = descripcion.replace("'", "''")
+            _ejecutar(client, f"""
+                INSERT INTO schema_migraciones (version, descripcion)
+                VALUES ({version}, '{descripcion_sql}')
+                ON CONFLICT (version) DO NOTHING
+            """)
+        except Exception as e:
+            # Las sentencias son idempotentes: la migración se reintenta en el próximo arranque
+            print(f"Error en migración {version} ({descripcion}): {str(e)}")
+            break
+        actual = version
+    
+    # PostgREST debe recargar su esquema para exponer tablas y funciones nuevas
+    try:
+        _ejecutar(client, "NOTIFY pgrst, 'reload schema'")
+    except Exception as e:
+        print(f"Error recargando esquema: {str(e)}")
+    
+    return actual
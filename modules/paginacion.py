@@ -0,0 +1,22 @@
+from typing import Any, Callable, Dict, Iterator, List
+
+# Límite de filas por petición (coincide con el max-rows por defecto de PostgREST)
+TAMANO_PAGINA = 1000
+
+def iter_rangos(construir: Callable[[], Any], tamano_pagina: int = TAMANO_PAGINA) -> Iterator[List[Dict]]:
+    """Páginas de una consulta pedidas por rangos de offset.
+
+    `construir` devuelve la consulta sin `.range()` y con un orden estable.
+    Pensado para tablas pequeñas o sin columna `id` (si no, mejor keyset).
+    El servidor puede devolver menos filas que las pedidas (max-rows menor
+    que `tamano_pagina`): se avanza lo recibido y solo una página vacía termina.
+    """
+    inicio = 0
+    while True:
+        pagina = construir().range(inicio, inicio + tamano_pagina - 1).execute().data
+        if not pagina:
+            return
+
+        yield pagina
+
+        inicio += len(pagina)
@@ -0,0 +1,224 @@
+"""Réplica local en SQLite de las tablas de movimientos.
+
+Opcional: se activa con `REPLICA_LOCAL = "ruta/al/archivo.sqlite3"` en
+secrets. Cada consulta trae primero de Supabase solo las filas con `id`
+posterior a la última marca y después se resuelve con SQL sobre el archivo
+local. Si Supabase no responde se sigue contestando con lo ya replicado.
+"""
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from modules.busqueda import buscar_local
+from modules.tipos import construir_frame
+
+# Columnas replicadas por tabla con su tipo en SQLite
+ESQUEMA_REPLICA: Dict[str, Dict[str, str]] = {
+    "compras": {
+        "id": "INTEGER PRIMARY KEY",
+        "fecha": "TEXT NOT NULL",
+        "categoria": "TEXT",
+        "producto": "TEXT",
+        "cantidad": "REAL",
+        "unidad_medida": "TEXT",
+        "monto": "REAL",
+        "proveedor": "TEXT",
+        "descripcion": "TEXT"
+    },
+    "gastos": {
+        "id": "INTEGER PRIMARY KEY",
+        "fecha": "TEXT NOT NULL",
+        "producto": "TEXT",
+        "categoria": "TEXT",
+        "monto": "REAL",
+        "descripcion": "TEXT",
+        "proveedor": "TEXT"
+    },
+    "ventas": {
+        "id": "INTEGER PRIMARY KEY",
+        "fecha": "TEXT NOT NULL",
+        "grupo": "TEXT",
+        "nombre": "TEXT",
+        "cantidad": "INTEGER",
+        "venta": "REAL",
+        "entidad": "TEXT",
+        "cliente": "TEXT"
+    }
+}
+
+# Columnas sumadas al agregar cada tabla
+MEDIDAS = {"compras": ["monto"], "gastos": ["monto"], "ventas": ["cantidad", "venta"]}
+
+# Cada cuánto se vacía la tabla local y se copia entera (borrados y ediciones)
+RECONCILIACION_SEGUNDOS = 3600
+
+# Tras un fallo de red no se reintenta sincronizar durante este tiempo
+ESPERA_TRAS_FALLO = 30
+
+class ReplicaLocal:
+    """Copia local de compras, gastos y ventas sincronizada por marca de agua de `id`"""
+
+    def __init__(self, db, ruta: str, reconciliacion: float = RECONCILIACION_SEGUNDOS):
+        self.db = db
+        self.ruta = ruta
+        self.reconciliacion = reconciliacion
+        self._reconciliado_en: Dict[str, float] = {}
+        self._fallo_en: Optional[float] = None
+        self._lock = threading.Lock()
+        # Una sola conexión compartida por los hilos de Streamlit, protegida por el lock
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._crear_tablas()
+
+    @staticmethod
+    def _definicion(tabla: str) -> str:
+        return ", ".join(f"{c} {tipo}" for c, tipo in ESQUEMA_REPLICA[tabla].items())
+
+    def _crear_tablas(self):
+        with self._lock, self._conexion:
+            for tabla in ESQUEMA_REPLICA:
+                self._conexion.execute(f"CREATE TABLE IF NOT EXISTS {tabla} ({self._definicion(tabla)})")
+                self._conexion.execute(f"CREATE INDEX IF NOT EXISTS idx_{tabla}_fecha ON {tabla} (fecha)")
+
+    def _marca(self, tabla: str) -> Optional[int]:
+        return self._conexion.execute(f"SELECT MAX(id) FROM {tabla}").fetchone()[0]
+
+    def sincronizar(self, tabla: str) -> int:
+        """Copia las filas nuevas de `tabla`; devuelve cuántas se escribieron.
+
+        Un fallo de red no se propaga: se sigue con los datos locales.
+        """
+        if self._fallo_en is not None and time.monotonic() - self._fallo_en < ESPERA_TRAS_FALLO:
+            return 0
+
+        columnas = list(ESQUEMA_REPLICA[tabla])
+        with self._lock:
+            completa = time.monotonic() - self._reconciliado_en.get(tabla, float("-inf")) >= self.reconciliacion
+            if completa:
+                # Se marca ya para que otra sesión no lance a la vez la misma copia completa
+                self._reconciliado_en[tabla] = time.monotonic()
+            desde_id = None if completa else self._marca(tabla)
+
+        # La copia completa se llena en una tabla auxiliar y se intercambia al terminar
+        destino = f"{tabla}_nueva" if completa else tabla
+        if completa:
+            with self._lock, self._conexion:
+                self._conexion.execute(f"DROP TABLE IF EXISTS {destino}")
+                self._conexion.execute(f"CREATE TABLE {destino} ({self._definicion(tabla)})")
+
+        lista = ", ".join(columnas)
+        insertar = f"INSERT OR REPLACE INTO {destino} ({lista}) VALUES ({', '.join('?' for _ in columnas)})"
+        escritas = 0
+        try:
+            # Cada página se escribe al llegar: la memoria no crece con la tabla y el
+            # lock solo se toma para escribir, nunca mientras se espera a la red
+            for pagina in self.db.iter_paginas(tabla, columnas=columnas, desde_id=desde_id):
+                with self._lock, self._conexion:
+                    self._conexion.executemany(insertar, [tuple(fila.get(c) for c in columnas) for fila in pagina])
+                escritas += len(pagina)
+        except Exception as e:
+            print(f"Réplica local sin sincronizar {tabla}: {str(e)}")
+            self._fallo_en = time.monotonic()
+            if completa:
+                # Se conserva la copia anterior y se reintenta la completa tras la espera
+                with self._lock, self._conexion:
+                    self._conexion.execute(f"DROP TABLE IF EXISTS {destino}")
+                    self._reconciliado_en.pop(tabla, None)
+                return 0
+            return escritas
+
+        self._fallo_en = None
+        if completa:
+            with self._lock, self._conexion:
+                self._conexion.execute(f"DELETE FROM {tabla}")
+                self._conexion.execute(f"INSERT INTO {tabla} ({lista}) SELECT {lista} FROM {destino}")
+                self._conexion.execute(f"DROP TABLE {destino}")
+        return escritas
+
+    def reconciliar(self, tabla: Optional[str] = None):
+        """Fuerza la copia completa en la próxima sincronización"""
+        with self._lock:
+            if tabla is None:
+                self._reconciliado_en.clear()
+            else:
+                self._reconciliado_en.pop(tabla, None)
+
+    def _where(self, filtros: Dict) -> tuple:
+        condiciones, parametros = [], []
+        if filtros.get('fecha_inicio') and filtros.get('fecha_fin'):
+            condiciones.append("fecha BETWEEN ? AND ?")
+            parametros += [filtros['fecha_inicio'], filtros['fecha_fin']]
+        if filtros.get('categoria'):
+            # Equivalente de ilike '%categoria%' (LIKE no distingue mayúsculas en SQLite)
+            patron = filtros['categoria'].replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            condiciones.append("categoria LIKE ? ESCAPE '\\'")
+            parametros.append(f"%{patron}%")
+        return (" WHERE " + " AND ".join(condiciones) if condiciones else ""), parametros
+
+    def _filas(self, sql: str, parametros: Sequence) -> List[Dict]:
+        with self._lock:
+            cursor = self._conexion.execute(sql, parametros)
+            nombres = [d[0] for d in cursor.description]
+            return [dict(zip(nombres, fila)) for fila in cursor]
+
+    def consultar(
+        self,
+        tabla: str,
+        filtros: Dict,
+        columnas: Sequence[str],
+        limite_busqueda: Optional[int] = None
+    ) -> pd.DataFrame:
+        """Filas de `tabla` que cumplen `filtros` (incluida la búsqueda por texto)"""
+        self.sincronizar(tabla)
+        columnas = [c for c in columnas if c in ESQUEMA_REPLICA[tabla]]
+        seleccion = list(dict.fromkeys([*columnas, "producto", "descripcion"])) if filtros.get('busqueda') else columnas
+        where, parametros = self._where(filtros)
+        filas = self._filas(f"SELECT {', '.join(seleccion)} FROM {tabla}{where} ORDER BY fecha, id", parametros)
+        if filtros.get('busqueda'):
+            filas = buscar_local(filas, filtros['busqueda'], limite_busqueda)
+        return construir_frame(filas, tabla, columnas)
+
+    def pagina(
+        self,
+        tabla: str,
+        filtros: Dict,
+        columnas: Sequence[str],
+        orden: str,
+        descendente: bool,
+        inicio: int,
+        tamano: int
+    ) -> tuple:
+        """(DataFrame de una página ordenada, total de filas que cumplen los filtros)"""
+        self.sincronizar(tabla)
+        if orden not in ESQUEMA_REPLICA[tabla]:
+            raise ValueError(f"Columna de orden no válida: {orden}")
+        columnas = [c for c in columnas if c in ESQUEMA_REPLICA[tabla]]
+        where, parametros = self._where(filtros)
+        direccion = "DESC" if descendente else "ASC"
+        total = self._filas(f"SELECT COUNT(*) AS total FROM {tabla}{where}", parametros)[0]["total"]
+        filas = self._filas(
+            f"SELECT {', '.join(columnas)} FROM {tabla}{where} "
+            f"ORDER BY {orden} {direccion}, id {direccion} LIMIT ? OFFSET ?",
+            [*parametros, tamano, inicio]
+        )
+        return construir_frame(filas, tabla, columnas), total
+
+    def agregar(self, tabla: str, filtros: Dict, agrupar: Sequence[str]) -> pd.DataFrame:
+        """Sumas por `agrupar` calculadas con SQL local (columnas del resumen diario)"""
+        self.sincronizar(tabla)
+        agrupar = [c for c in agrupar if c in ESQUEMA_REPLICA[tabla]]
+        claves = ", ".join(agrupar)
+        sumas = ", ".join(f"SUM({m}) AS {m}" for m in MEDIDAS[tabla])
+        where, parametros = self._where(filtros)
+        filas = self._filas(
+            f"SELECT {claves}, {sumas}, COUNT(*) AS registros FROM {tabla}{where} GROUP BY {claves} ORDER BY {claves}",
+            parametros
+        )
+        return construir_frame(filas, tabla, [*agrupar, *MEDIDAS[tabla], "registros"])
+
+    def cerrar(self):
+        with self._lock:
+            self._conexion.close()
@@ -0,0 +1,68 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+# Segundos entre comprobaciones de la conexión
+INTERVALO = 30
+
+# Comprobaciones recientes sobre las que se calculan percentiles y tasa de error
+VENTANA = 120
+
+def _percentil(ordenados, p: float) -> Optional[float]:
+    if not ordenados:
+        return None
+    return ordenados[min(len(ordenados) - 1, int(round(p * (len(ordenados) - 1))))]
+
+class MonitorSalud:
+    """Comprueba Supabase en segundo plano y guarda latencias y errores.
+
+    Los reruns solo leen el último estado calculado: nunca esperan a la red.
+    """
+
+    def __init__(self, client, intervalo: float = INTERVALO, ventana: int = VENTANA):
+        self.client = client
+        self.intervalo = intervalo
+        self._muestras = deque(maxlen=ventana)  # (momento, latencia en s, error o None)
+        self._lock = threading.Lock()
+        self._hilo = threading.Thread(target=self._trabajar, name="monitor-salud", daemon=True)
+        self._hilo.start()
+
+    def comprobar(self):
+        """Una comprobación: la consulta más barata posible sobre una tabla existente"""
+        inicio = time.perf_counter()
+        error = None
+        try:
+            self.client.table("compras").select("id").limit(1).execute()
+        except Exception as e:
+            error = str(e)
+        with self._lock:
+            self._muestras.append((time.time(), time.perf_counter() - inicio, error))
+
+    def _trabajar(self):
+        while True:
+            self.comprobar()
+            time.sleep(self.intervalo)
+
+    def estado(self) -> Dict:
+        """Último estado conocido: `ok` es None mientras no haya ninguna comprobación"""
+        with self._lock:
+            muestras = list(self._muestras)
+        if not muestras:
+            return {"ok": None, "muestras": 0}
+
+        momento, latencia, error = muestras[-1]
+        correctas = sorted(m[1] for m in muestras if m[2] is None)
+        errores = sum(1 for m in muestras if m[2] is not None)
+        ultimo_error = next((m[2] for m in reversed(muestras) if m[2] is not None), None)
+        return {
+            "ok": error is None,
+            "latencia": latencia,
+            "p50": _percentil(correctas, 0.50),
+            "p95": _percentil(correctas, 0.95),
+            "p99": _percentil(correctas, 0.99),
+            "tasa_error": errores / len(muestras),
+            "muestras": len(muestras),
+            "ultimo_error": ultimo_error,
+            "comprobado_en": momento
+        }
@@ -0,0 +1,82 @@
+"""Decodificación de resultados de Supabase a DataFrames con tipos explícitos.
+
+`pd.DataFrame(result.data)` deja todo como object: fechas como texto, montos
+como str o Decimal y etiquetas repetidas como strings de Python. Aquí cada
+columna conocida se construye directamente desde el JSON con su tipo nativo.
+"""
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import pandas as pd
+
+FECHA = "fecha"
+MARCA_TIEMPO = "marca_tiempo"
+CATEGORIA = "categoria"
+DINERO = "dinero"
+DECIMAL = "decimal"
+ENTERO = "entero"
+
+# Tipo de cada columna conocida (las no listadas quedan como object)
+TIPOS_COLUMNAS: Dict[str, str] = {
+    "id": ENTERO,
+    "fecha": FECHA,
+    "created_at": MARCA_TIEMPO,
+    "reservado_en": MARCA_TIEMPO,
+    "categoria": CATEGORIA,
+    "grupo": CATEGORIA,
+    "entidad": CATEGORIA,
+    "cliente": CATEGORIA,
+    "unidad_medida": CATEGORIA,
+    "monto": DINERO,
+    "venta": DINERO,
+    "cantidad": DECIMAL,
+    "registros": ENTERO,
+    "filas": ENTERO
+}
+
+# `cantidad` es entera en ventas y NUMERIC(10,3) en compras
+TIPOS_POR_TABLA: Dict[str, Dict[str, str]] = {
+    "ventas": {"cantidad": ENTERO},
+    "resumen_diario_ventas": {"cantidad": ENTERO}
+}
+
+def _tipo(columna: str, tabla: Optional[str]) -> Optional[str]:
+    return TIPOS_POR_TABLA.get(tabla, {}).get(columna, TIPOS_COLUMNAS.get(columna))
+
+def _serie(valores: List, tipo: Optional[str]) -> pd.Series:
+    if tipo == FECHA:
+        return pd.Series(pd.to_datetime(valores, format="%Y-%m-%d", errors="coerce"))
+    if tipo == MARCA_TIEMPO:
+        return pd.Series(pd.to_datetime(valores, format="ISO8601", errors="coerce"))
+    if tipo == CATEGORIA:
+        return pd.Series(valores, dtype="category")
+    if tipo in (DINERO, DECIMAL):
+        # NUMERIC llega como número o como texto según la configuración de PostgREST
+        return pd.Series(pd.to_numeric(pd.Series(valores, dtype=object), errors="coerce"), dtype="float64")
+    if tipo == ENTERO:
+        return pd.Series(pd.to_numeric(pd.Series(valores, dtype=object), errors="coerce")).astype("Int64")
+    return pd.Series(valores, dtype=object)
+
+def construir_frame(
+    registros: Iterable[Dict],
+    tabla: Optional[str] = None,
+    columnas: Optional[Sequence[str]] = None
+) -> pd.DataFrame:
+    """DataFrame tipado a partir de filas JSON (lista de dicts)"""
+    registros = registros if isinstance(registros, list) else list(registros)
+    if columnas is None:
+        columnas = list(dict.fromkeys(c for registro in registros[:1] for c in registro))
+    return pd.DataFrame({
+        columna: _serie([registro.get(columna) for registro in registros], _tipo(columna, tabla))
+        for columna in columnas
+    })
+
+def aplicar_tipos(df: pd.DataFrame, tabla: Optional[str] = None) -> pd.DataFrame:
+    """Restablece los tipos tras un concat (que degrada categorías distintas a object)"""
+    for columna in df.columns:
+        tipo = _tipo(columna, tabla)
+        if tipo == CATEGORIA and df[columna].dtype != "category":
+            df[columna] = df[columna].astype("category")
+    return df
+
+def concatenar(frames: Sequence[pd.DataFrame], tabla: Optional[str] = None) -> pd.DataFrame:
+    return aplicar_tipos(pd.concat(frames, ignore_index=True), tabla)
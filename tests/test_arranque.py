@@ -0,0 +1,6 @@
+from modules.arranque import informe
+
+def test_arranque_dentro_del_presupuesto():
+    """El arranque cabe en PRESUPUESTO_SEGUNDOS y no carga dependencias diferidas"""
+    correcto, lineas = informe()
+    assert correcto, "\n".join(lineas)
@@ -3,6 +3,8 @@ import pandas as pd
 from datetime import datetime, timedelta      
 from streamlit_option_menu import option_menu
 from auth.auth import logout
+from modules.logic.consultas import ConsultasLogic
+from interfaces.consultas.tabla_paginada import mostrar_tabla_paginada
 
 class InterfaceManager:
     def __init__(self, db):
@@ -206,64 +208,66 @@ class InterfaceManager:
         producto_busqueda = st.text_input("Buscar por producto", placeholder="Opcional...")
         
         if st.button("🔍 Ejecutar Búsqueda", type="primary"):
-            try:
-                # Verificación de consistencia de fechas
-                if fecha_inicio > fecha_fin:
-                    st.error("❌ La fecha inicial no puede ser mayor a la final")
-                    return
-                    
-                # Determinar tabla
-                tabla = "compras" if categoria_seleccionada == "Mercancía" else "gastos"
-                
-                # Construir parámetros con valores normalizados
-                filters = {
-                    "categoria": categoria_seleccionada.strip(),
-                    "fecha_inicio": fecha_inicio.isoformat(),
-                    "fecha_fin": fecha_fin.isoformat(),
-                    "search": producto_busqueda.strip() if producto_busqueda else None
-                }
-                
-                st.write("⚙️ Filtros enviados a la consulta:", filters)  # Debug 7
-                
-                # Ejecutar consulta
-                datos = self.db.execute_safe_query(tabla, filters)
-                
-                # Verificación de datos vacíos
-                if not datos:
-                    st.warning(f"⚠️ No hay registros de {categoria_seleccionada} entre {fecha_inicio} y {fecha_fin}")
-                    return
-                    
-                # Procesamiento de datos con verificación de columnas
-                df = pd.DataFrame(datos)
-                columnas_requeridas = {
-                    "compras": ["fecha", "producto", "monto", "categoria", "cantidad", "unidad_medida"],
-                    "gastos": ["fecha", "producto", "monto", "categoria", "descripcion"]
+            # Verificación de consistencia de fechas
+            if fecha_inicio > fecha_fin:
+                st.error("❌ La fecha inicial no puede ser mayor a la final")
+                return
+            
+            # Construir parámetros con valores normalizados (se conservan para paginar)
+            st.session_state.legacy_consulta = {
+                "categoria": categoria_seleccionada.strip(),
+                "fecha_inicio": fecha_inicio.isoformat(),
+                "fecha_fin": fecha_fin.isoformat(),
+                "search": producto_busqueda.strip() if producto_busqueda else None
+            }
+            st.session_state.legacy_consulta_pagina = 1
+        
+        filters = st.session_state.get("legacy_consulta")
+        if not filters:
+            return
+        
+        try:
+            # Determinar tabla
+            tabla = "compras" if filters["categoria"] == "Mercancía" else "gastos"
+            
+            st.write("⚙️ Filtros enviados a la consulta:", filters)  # Debug 7
+            
+            columnas_requeridas = {
+                "compras": ["fecha", "producto", "monto", "categoria", "cantidad", "unidad_medida"],
+                "gastos": ["fecha", "producto", "monto", "categoria", "descripcion"]
+            }
+            
+            logic = ConsultasLogic(self.db)
+            filtros = {
+                "categoria": filters["categoria"],
+                "fecha_inicio": filters["fecha_inicio"],
+                "fecha_fin": filters["fecha_fin"],
+                "busqueda": filters["search"]
+            }
+            
+            # Totales desde el resumen diario: no hace falta descargar todas las filas
+            agregado = logic.obtener_agregado(tabla, filtros)
+            
+            # Verificación de datos vacíos
+            if agregado.empty:
+                st.warning(f"⚠️ No hay registros de {filters['categoria']} entre {filters['fecha_inicio']} y {filters['fecha_fin']}")
+                return
+            
+            # Mostrar resultados página a página (orden y total calculados en el servidor)
+            mostrar_tabla_paginada(
+                lambda pagina, tamano, orden, descendente: logic.obtener_pagina(
+                    tabla, filtros, pagina, tamano, orden, descendente
+                ),
+                columnas_requeridas[tabla],
+                clave="legacy_consulta",
+                column_config={
+                    "monto": st.column_config.NumberColumn(format="$%.2f"),
+                    "fecha": st.column_config.DateColumn(format="DD/MM/YYYY"),
+                    "cantidad": st.column_config.NumberColumn(format="%.3f") if tabla == "compras" else None
                 }
-                
-                # Verificar existencia de columnas
-                columnas_faltantes = [col for col in columnas_requeridas[tabla] if col not in df.columns]
-                if columnas_faltantes:
-                    st.error(f"🚨 Columnas faltantes en la respuesta: {', '.join(columnas_faltantes)}")
-                    return
-                
-                # Mostrar resultados
-                st.dataframe(
-                    df[columnas_requeridas[tabla]],
-                    column_config={
-                        "monto": st.column_config.NumberColumn(format="$%.2f"),
-                        "fecha": st.column_config.DateColumn(format="DD/MM/YYYY"),
-                        "cantidad": st.column_config.NumberColumn(format="%.3f") if tabla == "compras" else None
-                    },
-                    height=400,
-                    use_container_width=True
-                )
-                
-                # Cálculo de total con verificación
-                try:
-                    total = df['monto'].sum()
-                    st.metric(f"📊 Total {categoria_seleccionada}", f"${total:,.2f}")
-                except KeyError:
-                    st.error("🔍 La columna 'monto' no existe en los datos recibidos")
-                
-            except Exception as e:
-                st.error(f"🚑 Error crítico: {str(e)}")
\ No newline at end of file
+            )
+            
+            st.metric(f"📊 Total {filters['categoria']}", f"${agregado['monto'].sum():,.2f}")
+            
+        except Exception as e:
+            st.error(f"🚑 Error crítico: {str(e)}")
\ No newline at end of file